@@ -0,0 +1,185 @@
+# answer_cache.py  – answers to repeated questions without re-running the RAG flow
+
+import math
+import re
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any
+
+import config
+from embeddings import OllamaEmbedder
+
+
+def normalize(query: str) -> str:
+    """Case, spacing and trailing punctuation don't change the question."""
+    q = unicodedata.normalize("NFKC", query).casefold()
+    q = re.sub(r"\s+", " ", q).strip()
+    return q.rstrip(" ?!.")
+
+
+def _unit(vec: list[float]) -> list[float]:
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+@dataclass
+class _Entry:
+    response: Any
+    latency: float                      # what the flow run cost us
+    created_at: float
+    vector: list[float] | None = None
+
+
+@dataclass
+class Lookup:
+    """Result of `AnswerCache.get`; hand it back to `put` on a miss."""
+
+    session_id: str
+    query: str
+    version: tuple[int, int]
+    response: Any = None
+    vector: list[float] | None = None
+
+    @property
+    def hit(self) -> bool:
+        return self.response is not None
+
+
+class AnswerCache:
+    """LRU + TTL cache of flow responses keyed by (session, query).
+
+    Each session searches its own collection, so every finished ingestion
+    run for a session bumps that session's corpus version and drops the
+    answers computed against its old chunks. With `similarity` > 0 a miss on
+    the exact query falls back to the closest cached question of the same
+    session whose embedding has at least that cosine similarity.
+    """
+
+    def __init__(
+        self,
+        size: int = config.ANSWER_CACHE_SIZE,
+        ttl: float = config.ANSWER_CACHE_TTL,
+        similarity: float = config.ANSWER_CACHE_SIMILARITY,
+        embedder: OllamaEmbedder | None = None,
+    ):
+        self.size, self.ttl, self.similarity = size, ttl, similarity
+        self._embedder = embedder if similarity > 0 else None
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._epoch = 0                                   # bumped by a full clear
+        self._versions: defaultdict[str, int] = defaultdict(int)
+        # the session store's change counters as last seen, see `sync`
+        self._corpus: dict[str, int] = {}
+        self._corpus_all: int | None = None
+        self.hits = self.semantic_hits = self.misses = 0
+        self.saved_s = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    # ── API ──────────────────────────────────────────────────────────────
+    def version(self, session_id: str) -> tuple[int, int]:
+        return self._epoch, self._versions[session_id]
+
+    async def get(self, session_id: str, query: str) -> Lookup:
+        lookup = Lookup(session_id, normalize(query), self.version(session_id))
+        if not self.enabled:
+            return lookup
+
+        entry = self._live((session_id, lookup.query))
+        if entry is None and self._embedder is not None:
+            lookup.vector = await self._embed(lookup.query)
+            entry = self._nearest(session_id, lookup.vector)
+            if entry is not None:
+                self.semantic_hits += 1
+
+        if entry is None:
+            self.misses += 1
+            return lookup
+        self.hits += 1
+        self.saved_s += entry.latency
+        lookup.response = entry.response
+        return lookup
+
+    def put(self, lookup: Lookup, response: Any, latency: float) -> None:
+        # an ingestion run finished while the flow was answering
+        if not self.enabled or lookup.version != self.version(lookup.session_id):
+            return
+        key = (lookup.session_id, lookup.query)
+        self._entries[key] = _Entry(response, latency, time.time(), lookup.vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str | None = None) -> None:
+        """Forget one session's answers, or everything without a session."""
+        if session_id is None:
+            self._epoch += 1
+            self._versions.clear()
+            self._entries.clear()
+            return
+        self._versions[session_id] += 1
+        for key in [k for k in self._entries if k[0] == session_id]:
+            del self._entries[key]
+
+    def sync(self, session_id: str, corpus: tuple[int, int]) -> None:
+        """Catch up with invalidations made by other workers. `corpus` is the
+        session store's (all sessions, this session) change counters; when
+        either moved since this worker last looked, the answers it covers go."""
+        everything, session = corpus
+        if self._corpus_all is not None and everything != self._corpus_all:
+            self.invalidate()
+            self._corpus.clear()
+        self._corpus_all = everything
+        if self._corpus.get(session_id, session) != session:
+            self.invalidate(session_id)
+        self._corpus[session_id] = session
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "sessions": len({k[0] for k in self._entries}),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_latency_s": round(self.saved_s, 3),
+        }
+
+    # ── internals ────────────────────────────────────────────────────────
+    def _live(self, key: tuple[str, str]) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _expired(self, entry: _Entry) -> bool:
+        return self.ttl > 0 and time.time() - entry.created_at > self.ttl
+
+    def _nearest(self, session_id: str, vector: list[float] | None) -> _Entry | None:
+        if vector is None:
+            return None
+        best_key, best = None, self.similarity
+        for key, entry in self._entries.items():
+            if key[0] != session_id or entry.vector is None or self._expired(entry):
+                continue
+            score = sum(a * b for a, b in zip(vector, entry.vector))
+            if score >= best:
+                best_key, best = key, score
+        return self._live(best_key) if best_key is not None else None
+
+    async def _embed(self, query: str) -> list[float] | None:
+        try:
+            [vec] = await self._embedder.embed([query])
+        except Exception as e:          # the exact-match cache still works
+            print(f"[AnswerCache] Embedding error: {e!r}")
+            return None
+        return _unit(vec)
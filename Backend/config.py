@@ -0,0 +1,131 @@
+# config.py  – backend settings, all overridable through env vars
+
+import os
+
+# ── Langflow ───────────────────────────────────────────────────────────
+LANGFLOW_URL    = os.getenv("LANGFLOW_URL", "http://127.0.0.1:7860").rstrip("/")
+UPLOAD_FLOW_ID  = os.getenv("UPLOAD_FLOW_ID", "24317109-1fb1-40b8-9fc0-fb69221694fe")
+QUERY_FLOW_ID   = os.getenv("QUERY_FLOW_ID",  "6fae6f07-db9f-4501-a5b9-4a5a2edaaeae")
+# the RAG flow's chat output carrying the formatted answer (sources marker,
+# images); the other one is the raw LLM text
+QUERY_ANSWER_NODE = os.getenv("QUERY_ANSWER_NODE", "ChatOutput-E1fyZ")
+
+# per-route read timeouts (seconds) – ingestion runs PDF parsing + embeddings
+QUERY_TIMEOUT   = float(os.getenv("LANGFLOW_QUERY_TIMEOUT",   "90"))
+UPLOAD_TIMEOUT  = float(os.getenv("LANGFLOW_UPLOAD_TIMEOUT",  "600"))
+CONNECT_TIMEOUT = float(os.getenv("LANGFLOW_CONNECT_TIMEOUT", "5"))
+
+# connection pool + how many flow runs we let hit Langflow at once
+MAX_CONNECTIONS = int(os.getenv("LANGFLOW_MAX_CONNECTIONS", "32"))
+MAX_KEEPALIVE   = int(os.getenv("LANGFLOW_MAX_KEEPALIVE",   "16"))
+KEEPALIVE_EXPIRY = float(os.getenv("LANGFLOW_KEEPALIVE_EXPIRY", "30"))
+MAX_CONCURRENCY = int(os.getenv("LANGFLOW_MAX_CONCURRENCY", "16"))
+# of those, at most this many go to bulk ingestion; chat gets the rest first
+BULK_MAX_CONCURRENCY = int(os.getenv("LANGFLOW_BULK_CONCURRENCY", "4"))
+
+# ── Admission control ──────────────────────────────────────────────────
+# queries allowed to wait for a flow slot beyond MAX_CONCURRENCY; more get 429
+QUERY_QUEUE_LIMIT    = int(os.getenv("QUERY_QUEUE_LIMIT", "32"))
+SESSION_MAX_INFLIGHT = int(os.getenv("SESSION_MAX_INFLIGHT", "2"))   # per session
+INGEST_QUEUE_LIMIT   = int(os.getenv("INGEST_QUEUE_LIMIT", "100"))   # queued ingestion jobs
+RETRY_AFTER_S        = float(os.getenv("RETRY_AFTER_S", "2"))
+
+# ── Storage ────────────────────────────────────────────────────────────
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploaded_files")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# content-addressed page images, written by the loader flow's FolderFileReader
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(UPLOAD_DIR, ".images"))
+# where uploads are kept (see storage.py): "local" (UPLOAD_DIR, shared with
+# Langflow and – with several workers – between them) or "s3"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+S3_BUCKET       = os.getenv("S3_BUCKET", "")
+S3_PREFIX       = os.getenv("S3_PREFIX", "uploads/")
+S3_REGION       = os.getenv("S3_REGION", "us-east-1")
+# MinIO / Ceph / benchmarks/stub_s3.py; empty = AWS S3 in S3_REGION
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "").rstrip("/")
+S3_ACCESS_KEY   = os.getenv("S3_ACCESS_KEY", os.getenv("AWS_ACCESS_KEY_ID", ""))
+S3_SECRET_KEY   = os.getenv("S3_SECRET_KEY", os.getenv("AWS_SECRET_ACCESS_KEY", ""))
+S3_TIMEOUT      = float(os.getenv("S3_TIMEOUT", "60"))
+# with "s3": local mirror of a session's objects that the loader flow reads
+STAGING_DIR     = os.getenv("STAGING_DIR", os.path.join(UPLOAD_DIR, ".staging"))
+
+# ── Session store ──────────────────────────────────────────────────────
+# chat histories, file lists, job status and question banks, shared by all
+# workers (see session_store.py): a SQLite path, or a redis:// URL
+SESSION_STORE        = os.getenv("SESSION_STORE", "sessions.sqlite3")
+SESSION_STORE_PREFIX = os.getenv("SESSION_STORE_PREFIX", "ot:")     # Redis key prefix
+HISTORY_MAX          = int(os.getenv("HISTORY_MAX", "200"))          # messages per GET
+
+# ── Vector store ───────────────────────────────────────────────────────
+# "atlas" (MongoDB Atlas Vector Search) or "local" (memory-mapped index on the
+# Langflow host); passed to the flows' vector-store nodes via tweaks. The
+# hybrid-search BM25 indexes live under LOCAL_VECTOR_DIR for both backends.
+VECTOR_BACKEND   = os.getenv("VECTOR_BACKEND", "atlas")
+LOCAL_VECTOR_DIR = os.getenv("LOCAL_VECTOR_DIR", os.path.join(UPLOAD_DIR, ".vectors"))
+INGEST_VECTOR_NODES = [n for n in os.getenv(
+    "INGEST_VECTOR_NODES",
+    "MongoDBAtlasVector-Wq2en,CreateCosineVectorIndex-NGnfO,ParserComponent-SIZ7Y",
+).split(",") if n]
+QUERY_VECTOR_NODES = [n for n in os.getenv(
+    "QUERY_VECTOR_NODES", "MongoDBAtlasVector-OORfe"
+).split(",") if n]
+
+# ── Prompt budget ──────────────────────────────────────────────────────
+# Context Assembler nodes pack retrieved passages into at most this many
+# (estimated) tokens, so prompt size doesn't grow with the manuals
+QUERY_CONTEXT_TOKENS  = int(os.getenv("QUERY_CONTEXT_TOKENS", "2000"))
+INGEST_CONTEXT_TOKENS = int(os.getenv("INGEST_CONTEXT_TOKENS", "3000"))   # loader's suggestion agent
+QUERY_CONTEXT_NODES  = [n for n in os.getenv("QUERY_CONTEXT_NODES", "ContextAssembler-Rq7Tz").split(",") if n]
+INGEST_CONTEXT_NODES = [n for n in os.getenv("INGEST_CONTEXT_NODES", "ContextAssembler-Vd8Lk").split(",") if n]
+
+# responses smaller than this are sent uncompressed even to gzip clients
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+
+# ── Ingestion jobs ─────────────────────────────────────────────────────
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+JOB_HISTORY    = int(os.getenv("JOB_HISTORY", "500"))     # finished jobs kept for polling
+# how Langflow components reach us to report progress
+BACKEND_URL    = os.getenv("BACKEND_URL", "http://127.0.0.1:8000").rstrip("/")
+# loader-flow nodes that accept a `progress_url` tweak
+PROGRESS_NODES = [n for n in os.getenv(
+    "INGEST_PROGRESS_NODES", "FolderFileReader-X3ZHU,ParserComponent-SIZ7Y"
+).split(",") if n]
+# per-folder manifest of file + chunk hashes, so re-ingestion only touches changes
+MANIFEST_NAME  = ".ingest_manifest.json"
+MANIFEST_NODES = [n for n in os.getenv("INGEST_MANIFEST_NODES", "ParserComponent-SIZ7Y").split(",") if n]
+# loader-flow nodes that write page images; they get IMAGE_STORE_DIR as `image_dir`
+IMAGE_NODES    = [n for n in os.getenv("INGEST_IMAGE_NODES", "FolderFileReader-X3ZHU").split(",") if n]
+
+# ── Suggestions ────────────────────────────────────────────────────────
+# follow-up questions come from a per-session bank the loader builds at
+# ingestion (see question_bank.py), not from the answer's flow run
+QUESTION_BANK_MAX  = int(os.getenv("QUESTION_BANK_MAX", "200"))   # questions kept per session
+SUGGESTION_COUNT   = int(os.getenv("SUGGESTION_COUNT", "3"))      # per chat turn
+
+# ── Answer cache ───────────────────────────────────────────────────────
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))        # 0 disables it
+ANSWER_CACHE_TTL  = float(os.getenv("ANSWER_CACHE_TTL", "3600"))      # seconds, 0 = no expiry
+# cosine similarity for "same question, different words" hits; 0 = exact match only
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+
+# ── Embeddings ─────────────────────────────────────────────────────────
+# must match the OllamaEmbeddings nodes of both flows
+OLLAMA_URL    = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434").rstrip("/")
+EMBED_MODEL   = os.getenv("EMBED_MODEL", "mxbai-embed-large:latest")
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "10"))
+
+# ── Task events ────────────────────────────────────────────────────────
+# Task-mode checklist events (SQLite, WAL); buffered and committed in batches
+TASK_EVENTS_DB = os.getenv("TASK_EVENTS_DB", "task_events.sqlite3")
+TASK_EVENTS_BATCH = int(os.getenv("TASK_EVENTS_BATCH", "200"))
+TASK_EVENTS_FLUSH_INTERVAL = float(os.getenv("TASK_EVENTS_FLUSH_INTERVAL", "1"))
+# the UI's former CSV log, imported once into an empty store when it exists
+INTERACTIONS_CSV = os.getenv("INTERACTIONS_CSV", "interactions.csv")
+
+# ── Telemetry ──────────────────────────────────────────────────────────
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "500"))          # traces kept for /api/traces
+# traces this slow (and every failed one) are printed as one JSON line; -1 = errors only
+TRACE_LOG_SLOW_S = float(os.getenv("TRACE_LOG_SLOW_S", "10"))
+# opt-in stack sampling of requests sent with `X-Profile: 1`
+PROFILING = os.getenv("PROFILING", "0") == "1"
+PROFILE_INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_S", "0.005"))
@@ -0,0 +1,26 @@
+# embeddings.py  – query embeddings from the same Ollama model the flows use
+
+import httpx
+
+import config
+import telemetry
+
+
+class OllamaEmbedder:
+    """Thin async wrapper around Ollama's `/api/embed`."""
+
+    def __init__(self, base_url: str = config.OLLAMA_URL, model: str = config.EMBED_MODEL):
+        self.model = model
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(config.EMBED_TIMEOUT, connect=config.CONNECT_TIMEOUT),
+        )
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        with telemetry.span("ollama.embed", texts=len(texts)):
+            r = await self._client.post("/api/embed", json={"model": self.model, "input": texts})
+            r.raise_for_status()
+            return r.json()["embeddings"]
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
@@ -0,0 +1,35 @@
+# image_store.py  – read side of the content-addressed page image store
+#
+# The loader flow writes every extracted image once as
+# <IMAGE_STORE_DIR>/<id[:2]>/<id>.<ext>, where id is the sha256 of the bytes.
+# Chunks and answers only carry the id (or /api/images/<id>).
+
+import glob
+import os
+import re
+
+import config
+
+IMAGE_ID = re.compile(r"^[0-9a-f]{64}$")
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "jpx": "image/jpx",
+    "jp2": "image/jp2",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+    "tif": "image/tiff",
+    "tiff": "image/tiff",
+}
+
+
+def find(image_id: str, root: str = config.IMAGE_STORE_DIR) -> tuple[str, str] | None:
+    """Return (path, media type) for a stored image, or None."""
+    if not IMAGE_ID.match(image_id):
+        return None
+    for path in glob.glob(os.path.join(root, image_id[:2], f"{image_id}.*")):
+        ext = path.rsplit(".", 1)[-1].lower()
+        return path, MEDIA_TYPES.get(ext, "application/octet-stream")
+    return None
@@ -0,0 +1,236 @@
+# jobs.py  – background ingestion queue for /api/upload
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import config
+import telemetry
+
+
+def _counters() -> dict[str, int]:
+    return {"pages_parsed": 0, "chunks_split": 0, "chunks_embedded": 0, "chunks_stored": 0}
+
+
+@dataclass
+class IngestJob:
+    """One run of the Data_Loader flow over a session's upload folder."""
+
+    id: str
+    session_id: str
+    folder: str
+    files: list[str]
+    status: str = "queued"          # queued | running | done | failed
+    counters: dict[str, int] = field(default_factory=_counters)
+    error: str | None = None
+    response: Any = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "session_id": self.session_id,
+            "files": self.files,
+            "status": self.status,
+            **self.counters,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """asyncio worker pool that runs ingestion jobs off the request path.
+
+    Runs for the same session are serialised (they read the same folder), and
+    uploads that arrive while a session's job is still queued join that job
+    instead of triggering another full folder run. With a session store, job
+    status and progress are mirrored there so any backend worker can answer
+    polls and take progress reports, and a per-session claim in the store
+    serialises runs across workers too.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[IngestJob], Awaitable[Any]],
+        store=None,
+        workers: int = config.INGEST_WORKERS,
+        history: int = config.JOB_HISTORY,
+    ):
+        self._runner = runner
+        self._store = store
+        self._owner = uuid.uuid4().hex                  # this worker, for claims
+        self._n_workers = workers
+        self._history = history
+        self._queue: asyncio.Queue[IngestJob] = asyncio.Queue()
+        self._jobs: OrderedDict[str, IngestJob] = OrderedDict()
+        self._pending: dict[str, IngestJob] = {}        # session → queued job
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._workers: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self._n_workers)]
+
+    async def stop(self) -> None:
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    # ── API ──────────────────────────────────────────────────────────────
+    def submit(self, session_id: str, folder: str, filename: str) -> IngestJob:
+        job = self._pending.get(session_id)
+        if job is not None:
+            job.files.append(filename)
+            return job
+
+        job = IngestJob(id=uuid.uuid4().hex, session_id=session_id,
+                        folder=folder, files=[filename])
+        self._jobs[job.id] = job
+        self._pending[session_id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def pending(self, session_id: str) -> IngestJob | None:
+        """The session's job that has not started yet (new uploads join it)."""
+        return self._pending.get(session_id)
+
+    def get(self, job_id: str) -> IngestJob | None:
+        return self._jobs.get(job_id)
+
+    async def publish(self, job: IngestJob) -> None:
+        """Write a job's status to the session store (owner worker only)."""
+        if self._store is not None:
+            await self._pull(job)
+            await self._store.put("jobs", job.id, job.to_dict())
+
+    async def lookup(self, job_id: str) -> dict | None:
+        """Job status as served by /api/jobs, whichever worker runs the job."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            await self._pull(job)
+            return job.to_dict()
+        if self._store is None:
+            return None
+        status = await self._store.get("jobs", job_id)
+        if status is None:
+            return None
+        for k, v in (await self._store.get("job_progress", job_id) or {}).items():
+            status[k] = max(status.get(k) or 0, v)
+        return status
+
+    async def report(self, job_id: str, counters: dict[str, Any]) -> bool:
+        """Progress from the loader flow, which may reach any worker."""
+        job = self.progress(job_id, counters)
+        if self._store is None:
+            return job is not None
+        if job is None and await self._store.get("jobs", job_id) is None:
+            return False
+        stored = await self._store.get("job_progress", job_id) or {}
+        for k, v in counters.items():
+            if isinstance(v, int) and not isinstance(v, bool):
+                stored[k] = max(stored.get(k, 0), v)
+        await self._store.put("job_progress", job_id, stored)
+        return True
+
+    def progress(self, job_id: str, counters: dict[str, Any]) -> IngestJob | None:
+        """Counters are absolute and only move forward."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        for k, v in counters.items():
+            if isinstance(v, int) and not isinstance(v, bool):
+                job.counters[k] = max(job.counters.get(k, 0), v)
+        return job
+
+    # ── workers ──────────────────────────────────────────────────────────
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                lock = self._locks.setdefault(job.session_id, asyncio.Lock())
+                async with lock:
+                    # from here on the folder is being read – new uploads get a new job
+                    if self._pending.get(job.session_id) is job:
+                        del self._pending[job.session_id]
+                    await self._claim(job.session_id)
+                    try:
+                        await self._run(job)
+                    finally:
+                        await self._release(job.session_id)
+            finally:
+                self._queue.task_done()
+                await self._prune()
+
+    async def _run(self, job: IngestJob) -> None:
+        job.status, job.started_at = "running", time.time()
+        await self._save(job)
+        # traced under the job id: GET /api/traces/{job_id}
+        trace, token = telemetry.start_trace("ingest", job.id)
+        try:
+            with telemetry.span("ingest.run", session_id=job.session_id, files=len(job.files)):
+                resp = await self._runner(job)
+        except Exception as e:          # never let one job kill a worker
+            resp = {"error": f"{type(e).__name__}: {e}"}
+
+        job.finished_at = time.time()
+        await self._pull(job)
+        if isinstance(resp, dict) and "error" in resp:
+            job.status, job.error = "failed", str(resp["error"])
+        else:
+            job.status, job.response = "done", resp
+            # the stock vector-store node embeds and inserts in one batch
+            split = job.counters["chunks_split"]
+            job.counters["chunks_embedded"] = max(job.counters["chunks_embedded"], split)
+            job.counters["chunks_stored"] = max(job.counters["chunks_stored"], split)
+
+        telemetry.finish_trace(trace, token, job.error)
+        telemetry.INGEST_JOBS.inc(job.status)
+        telemetry.INGEST_LATENCY.observe(job.finished_at - job.started_at)
+        telemetry.INGEST_ITEMS.inc("pages", amount=job.counters["pages_parsed"])
+        telemetry.INGEST_ITEMS.inc("chunks", amount=job.counters["chunks_stored"])
+        await self._save(job)
+
+    # ── session store ────────────────────────────────────────────────────
+    async def _pull(self, job: IngestJob) -> None:
+        """Fold in progress that other workers received for this job."""
+        if self._store is not None:
+            self.progress(job.id, await self._store.get("job_progress", job.id) or {})
+
+    async def _save(self, job: IngestJob) -> None:
+        try:
+            await self.publish(job)
+        except Exception as e:          # polls on this worker still work
+            print(f"[JobQueue] Could not publish job {job.id}: {e!r}")
+
+    async def _claim(self, session_id: str) -> None:
+        """Wait until no other worker is ingesting this session."""
+        if self._store is None:
+            return
+        ttl = config.UPLOAD_TIMEOUT + 60
+        while not await self._store.claim(f"ingest:{session_id}", self._owner, ttl):
+            await asyncio.sleep(1)
+
+    async def _release(self, session_id: str) -> None:
+        if self._store is not None:
+            await self._store.release(f"ingest:{session_id}", self._owner)
+
+    async def _prune(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.finished]
+        for job_id in finished[: max(len(finished) - self._history, 0)]:
+            del self._jobs[job_id]
+            if self._store is not None:
+                await self._store.delete("jobs", job_id)
+                await self._store.delete("job_progress", job_id)
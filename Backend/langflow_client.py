@@ -0,0 +1,152 @@
+# langflow_client.py  – shared async client for the Langflow run API
+
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import httpx
+
+import config
+import telemetry
+from scheduler import PrioritySlots
+
+
+class LangflowClient:
+    """One pooled `httpx.AsyncClient` per process.
+
+    Keeps connections to the Langflow host alive between runs and caps the
+    number of flow runs in flight, so a slow LLM turn never blocks the event
+    loop and a burst of queries can't open unbounded sockets. Runs take
+    their slot by priority: "interactive" chat before "bulk" ingestion.
+    """
+
+    def __init__(
+        self,
+        base_url: str = config.LANGFLOW_URL,
+        max_concurrency: int = config.MAX_CONCURRENCY,
+    ):
+        self.base_url = base_url
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Content-Type": "application/json"},
+            limits=httpx.Limits(
+                max_connections=config.MAX_CONNECTIONS,
+                max_keepalive_connections=config.MAX_KEEPALIVE,
+                keepalive_expiry=config.KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(config.QUERY_TIMEOUT, connect=config.CONNECT_TIMEOUT),
+        )
+        self._slots = PrioritySlots(max_concurrency)
+
+    async def run(self, flow_id: str, session_id: str, data: str,
+                  timeout: float = config.QUERY_TIMEOUT,
+                  tweaks: dict | None = None, priority: str = "interactive") -> Any:
+        """Fire a Langflow ‘run’ endpoint and return a *Python* object
+        (dict | list | str) that FastAPI can JSON-serialise cleanly.
+        """
+        payload = self._payload(session_id, data, tweaks)
+        with telemetry.span("langflow.run", flow_id=flow_id, priority=priority) as attrs:
+            try:
+                async with self._slot(priority):
+                    r = await self._client.post(
+                        f"/api/v1/run/{flow_id}",
+                        json=payload,
+                        timeout=httpx.Timeout(timeout, connect=config.CONNECT_TIMEOUT),
+                    )
+                r.raise_for_status()
+                attrs["response_bytes"] = len(r.content)
+
+                # Prefer JSON if possible
+                try:
+                    result = r.json()    # → dict / list
+                except ValueError:
+                    return r.text        # → str (already plain answer)
+                telemetry.record_components(result)
+                return result
+
+            except httpx.HTTPError as e:
+                attrs["error"] = repr(e)
+                return {"error": str(e) or type(e).__name__}  # still JSON-serialisable
+
+    async def stream(self, flow_id: str, session_id: str, data: str,
+                     timeout: float = config.QUERY_TIMEOUT,
+                     tweaks: dict | None = None,
+                     priority: str = "interactive") -> AsyncIterator[dict]:
+        """Run a flow with `?stream=true` and yield Langflow's events
+        (`{"event": "token" | "add_message" | "end" | "error", "data": …}`)
+        as soon as they arrive.
+        """
+        payload = self._payload(session_id, data, tweaks)
+        with telemetry.span("langflow.stream", flow_id=flow_id, priority=priority) as attrs:
+            try:
+                async with self._slot(priority):
+                    async with self._client.stream(
+                        "POST",
+                        f"/api/v1/run/{flow_id}",
+                        params={"stream": "true"},
+                        json=payload,
+                        timeout=httpx.Timeout(timeout, connect=config.CONNECT_TIMEOUT),
+                    ) as r:
+                        r.raise_for_status()
+                        async for event in _iter_events(r):
+                            if event.get("event") != "token":
+                                telemetry.record_components(event.get("data"))
+                            yield event
+            except httpx.HTTPError as e:
+                attrs["error"] = repr(e)
+                yield {"event": "error", "data": {"error": str(e) or type(e).__name__}}
+
+    @asynccontextmanager
+    async def _slot(self, priority: str):
+        """A concurrency slot; the wait for one is its own span."""
+        with telemetry.span("langflow.queue"):
+            await self._slots.acquire(priority)
+        try:
+            yield
+        finally:
+            self._slots.release(priority)
+
+    def slot_stats(self) -> dict:
+        return {"held": self._slots.held, "waiting": self._slots.waiting()}
+
+    @staticmethod
+    def _payload(session_id: str, data: str, tweaks: dict | None = None) -> dict:
+        payload = {
+            "session_id": session_id,
+            "input_value": data,
+            "output_type": "chat",
+            "input_type": "chat",
+        }
+        if tweaks:
+            payload["tweaks"] = tweaks
+        return payload
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+async def _iter_events(r: httpx.Response) -> AsyncIterator[dict]:
+    """Langflow streams one JSON object per event, blank-line separated
+    (optionally SSE-style `data:` prefixed)."""
+    buf: list[str] = []
+    async for line in r.aiter_lines():
+        if line.startswith("event:"):
+            continue
+        if line.strip():
+            buf.append(line[5:].lstrip() if line.startswith("data:") else line)
+            continue
+        if event := _parse_event(buf):
+            yield event
+        buf = []
+    if event := _parse_event(buf):
+        yield event
+
+
+def _parse_event(lines: list[str]) -> dict | None:
+    if not lines:
+        return None
+    try:
+        event = json.loads("".join(lines))
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) else None
@@ -1,13 +1,101 @@
 import os
 import json
+import time
+import asyncio
+import mimetypes
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Any, Dict
+from urllib.parse import quote
 
-import requests
-from fastapi import FastAPI, UploadFile, File, Form, Body
+from fastapi import FastAPI, UploadFile, File, Form, Body, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import (FileResponse, JSONResponse, PlainTextResponse, Response,
+                               StreamingResponse)
+from starlette.background import BackgroundTask
 
-app = FastAPI()
+import config
+import image_store
+import query_response
+import telemetry
+from answer_cache import AnswerCache
+from embeddings import OllamaEmbedder
+from jobs import IngestJob, JobQueue
+from langflow_client import LangflowClient
+from question_bank import QuestionBank
+from scheduler import Overloaded, Scheduler
+from session_store import open_store
+from storage import display_name, open_storage, previous_versions, valid_name
+from task_events import TaskEventStore
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one pooled client for the whole process (keep-alive to Langflow)
+    app.state.langflow = LangflowClient()
+    embedder = OllamaEmbedder() if config.ANSWER_CACHE_SIMILARITY > 0 else None
+    app.state.answers = AnswerCache(embedder=embedder)
+    app.state.scheduler = Scheduler()
+    # shared by every worker: uploads in STORAGE_BACKEND, the rest in SESSION_STORE
+    app.state.storage = open_storage()
+    app.state.sessions = open_store()
+    app.state.questions = QuestionBank(app.state.sessions)
+    app.state.task_events = TaskEventStore()
+    if os.path.isfile(config.INTERACTIONS_CSV) and app.state.task_events.is_empty():
+        n = app.state.task_events.import_csv(config.INTERACTIONS_CSV)
+        print(f"[TaskEventStore] Imported {n} events from {config.INTERACTIONS_CSV}")
+    app.state.task_events.start()
+
+    async def ingest(job: IngestJob):
+        storage = app.state.storage
+        with telemetry.span("storage.stage"):
+            await storage.stage(job.session_id)     # job.folder is current from here
+        progress_url = f"{config.BACKEND_URL}/api/jobs/{job.id}/progress"
+        manifest = os.path.join(job.folder, config.MANIFEST_NAME)
+        tweaks = vector_tweaks(config.INGEST_VECTOR_NODES)
+        for node in config.INGEST_CONTEXT_NODES:
+            tweaks.setdefault(node, {})["max_tokens"] = config.INGEST_CONTEXT_TOKENS
+        for node in config.PROGRESS_NODES:
+            tweaks.setdefault(node, {})["progress_url"] = progress_url
+        for node in config.MANIFEST_NODES:
+            tweaks.setdefault(node, {})["manifest_path"] = manifest
+        # the loader would otherwise put images next to job.folder, which under
+        # s3 is in STAGING_DIR – not where /api/images looks
+        for node in config.IMAGE_NODES:
+            tweaks.setdefault(node, {})["image_dir"] = os.path.abspath(config.IMAGE_STORE_DIR)
+        try:
+            resp = await app.state.langflow.run(config.UPLOAD_FLOW_ID, job.session_id,
+                                                job.folder, timeout=config.UPLOAD_TIMEOUT,
+                                                tweaks=tweaks, priority="bulk")
+        finally:
+            # even a failed run may have stored or deleted chunks
+            app.state.answers.invalidate(job.session_id)
+            await app.state.sessions.incr("corpus", job.session_id)   # other workers' caches
+        failed = isinstance(resp, dict) and "error" in resp
+        if failed:
+            forget_in_manifest(job.folder, job.files)   # retry them next run
+        await storage.commit(job.session_id)
+        if failed:
+            return resp
+        with telemetry.span("question_bank.update") as attrs:
+            attrs["questions"] = await app.state.questions.update(
+                job.session_id, await storage.names(job.session_id), job.files,
+                query_response.suggestions(resp))
+        return resp
+
+    app.state.jobs = JobQueue(ingest, app.state.sessions)
+    app.state.jobs.start()
+    yield
+    await app.state.jobs.stop()
+    await app.state.task_events.stop()
+    await app.state.langflow.aclose()
+    await app.state.storage.aclose()
+    await app.state.sessions.close()
+    if embedder is not None:
+        await embedder.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 # ── CORS ───────────────────────────────────────────────────────────────
 app.add_middleware(
@@ -16,77 +104,484 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
-UPLOAD_DIR = "uploaded_files"
+# for clients sending Accept-Encoding: gzip (SSE streams are never buffered)
+app.add_middleware(GZipMiddleware, minimum_size=config.GZIP_MIN_SIZE, compresslevel=5)
+# outermost: traces every request, including CORS preflights; sizes are on the wire
+app.add_middleware(telemetry.TelemetryMiddleware)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    return JSONResponse({"status": "rejected", "error": exc.reason}, status_code=429,
+                        headers={"Retry-After": f"{exc.retry_after:g}"})
 
 # ── Helpers ────────────────────────────────────────────────────────────
-def call_langflow(session_id: str, url: str, data: str):
-    """Fire a Langflow ‘run’ endpoint and return a *Python* object
-    (dict | list | str) that FastAPI can JSON-serialise cleanly.
-    """
-    payload = {
-        "session_id": session_id,
-        "input_value": data,
-        "output_type": "chat",
-        "input_type": "chat",
-    }
-    headers = {"Content-Type": "application/json"}
+async def call_langflow(request: Request, session_id: str, flow_id: str,
+                        data: str, timeout: float, tweaks: dict | None = None):
+    """Run a flow through the shared client without blocking the event loop."""
+    client: LangflowClient = request.app.state.langflow
+    return await client.run(flow_id, session_id, data, timeout=timeout, tweaks=tweaks)
 
+
+def vector_tweaks(nodes: list[str]) -> dict:
+    """Point the flows' vector-store nodes at the configured backend; the
+    BM25 index for hybrid search lives under LOCAL_VECTOR_DIR either way."""
+    tweak = {"vector_backend": config.VECTOR_BACKEND,
+             "local_index_dir": os.path.abspath(config.LOCAL_VECTOR_DIR)}
+    return {node: dict(tweak) for node in nodes}
+
+
+def query_tweaks() -> dict:
+    """Vector-store tweaks plus the context token budget for a RAG run."""
+    tweaks = vector_tweaks(config.QUERY_VECTOR_NODES)
+    for node in config.QUERY_CONTEXT_NODES:
+        tweaks.setdefault(node, {})["max_tokens"] = config.QUERY_CONTEXT_TOKENS
+    return tweaks
+
+
+def check_session(session_id: str) -> None:
+    """Session ids become folder names and object keys."""
+    if not valid_name(session_id):
+        raise HTTPException(status_code=422, detail="Invalid session_id")
+
+
+async def corpus_version(request: Request, session_id: str) -> tuple[int, int]:
+    """The store's (all sessions, this session) change counters, see AnswerCache.sync."""
+    sessions = request.app.state.sessions
+    return (await sessions.get("corpus", ".all") or 0,
+            await sessions.get("corpus", session_id) or 0)
+
+
+def forget_in_manifest(folder: str, names: list[str]) -> None:
+    """Drop files from the ingest manifest so the next run re-reads them."""
+    path = os.path.join(folder, config.MANIFEST_NAME)
     try:
-        r = requests.post(url, json=payload, headers=headers)
-        r.raise_for_status()
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return
+    files = manifest.get("files", {})
+    for name in names:
+        files.pop(name, None)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
 
-        # Prefer JSON if possible
-        try:
-            return r.json()      # → dict / list
-        except ValueError:
-            return r.text        # → str (already plain answer)
 
-    except requests.RequestException as e:
-        print(f"[Langflow] Request error: {e}")
-        return {"error": str(e)}  # still JSON-serialisable
+def sse(event: str, data: Any) -> str:
+    """One server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 # ── Routes ─────────────────────────────────────────────────────────────
 @app.post("/api/upload")
 async def upload_file(
+    request: Request,
     file: UploadFile = File(...),
     session_id: str = Form(...),
 ):
+    """Stream the file to storage and queue ingestion; poll /api/jobs/{job_id}.
+
+    Re-uploading a file name replaces the earlier version, so the loader only
+    embeds the chunks that changed and drops the ones that disappeared.
+    """
+    check_session(session_id)
+    if not valid_name(file.filename or ""):
+        raise HTTPException(status_code=422, detail="Invalid file name")
+    jobs: JobQueue = request.app.state.jobs
+    if jobs.queued() >= config.INGEST_QUEUE_LIMIT and not jobs.pending(session_id):
+        raise Overloaded("ingestion queue full")
+
+    storage    = request.app.state.storage
     timestamp  = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename   = f"{timestamp}_{file.filename}"
-    user_dir   = os.path.join(UPLOAD_DIR, session_id)
-    os.makedirs(user_dir, exist_ok=True)
+    replaced   = previous_versions(await storage.names(session_id), file.filename)
 
-    file_path = os.path.join(user_dir, filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    with telemetry.span("upload.write") as attrs:
+        size = await storage.save(session_id, filename, file)
+        attrs["bytes"] = size
+    telemetry.UPLOAD_BYTES.inc(amount=size)
+    for old in replaced:
+        if old != filename:
+            await storage.delete(session_id, old)
 
-    path = os.path.abspath(user_dir)
-    flow_url = "http://127.0.0.1:7860/api/v1/run/24317109-1fb1-40b8-9fc0-fb69221694fe"
-    resp = call_langflow(session_id, flow_url, path)
+    job = jobs.submit(session_id, storage.folder(session_id), filename)
+    await jobs.publish(job)
+    await request.app.state.sessions.append(
+        "uploads", session_id, [{"stored_name": filename, "job_id": job.id, "size": size}])
     return {
-        "status": "success",
+        "status": "queued",
+        "job_id": job.id,
         "filename": filename,
-        "file_path": file_path,
+        "file_path": os.path.join(storage.folder(session_id), filename),
         "session_id": session_id,
-        "response": resp,
     }
 
 
+async def resolve_file(storage, session_id: str, filename: str) -> list[str]:
+    """Stored names for a stored or display file name, newest first."""
+    if not valid_name(session_id) or not valid_name(filename):
+        raise HTTPException(status_code=404, detail="Unknown file")
+    names = await storage.names(session_id)
+    found = [filename] if filename in names else sorted(previous_versions(names, filename),
+                                                        reverse=True)
+    if not found:
+        raise HTTPException(status_code=404, detail="Unknown file")
+    return found
+
+
+@app.get("/api/files/{session_id}")
+async def list_files(request: Request, session_id: str):
+    """The session's uploads with the job that last ingested each one."""
+    check_session(session_id)
+    names = await request.app.state.storage.names(session_id)
+    uploads = {u["stored_name"]: u
+               for u in await request.app.state.sessions.items("uploads", session_id)}
+    return {"session_id": session_id, "files": [
+        {"name": display_name(n), "stored_name": n,
+         "size": uploads.get(n, {}).get("size"), "job_id": uploads.get(n, {}).get("job_id")}
+        for n in names
+    ]}
+
+
+@app.get("/api/files/{session_id}/{filename}")
+async def download_file(request: Request, session_id: str, filename: str):
+    """Stream an upload back (by stored or display name) – the UI links here
+    instead of keeping file bytes in its session."""
+    storage = request.app.state.storage
+    name = (await resolve_file(storage, session_id, filename))[0]
+    size = await storage.size(session_id, name)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Unknown file")
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return StreamingResponse(storage.iter_bytes(session_id, name), media_type=media_type, headers={
+        "Content-Length": str(size),
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(display_name(name))}",
+    })
+
+
+@app.delete("/api/files/{session_id}/{filename}")
+async def delete_file(request: Request, session_id: str, filename: str):
+    """Remove an uploaded file; a loader run then drops its chunks."""
+    storage = request.app.state.storage
+    names = await resolve_file(storage, session_id, filename)
+    for name in names:
+        await storage.delete(session_id, name)
+
+    jobs: JobQueue = request.app.state.jobs
+    job = jobs.submit(session_id, storage.folder(session_id), names[0])
+    await jobs.publish(job)
+    return {"status": "queued", "job_id": job.id, "removed": names, "session_id": session_id}
+
+
+@app.get("/api/sessions/{session_id}/history")
+async def get_history(request: Request, session_id: str, limit: int = config.HISTORY_MAX):
+    """The latest `limit` chat messages of a session and how many there are."""
+    check_session(session_id)
+    sessions = request.app.state.sessions
+    total = await sessions.length("history", session_id)
+    limit = max(0, min(limit, config.HISTORY_MAX))
+    return {"session_id": session_id, "total": total,
+            "messages": await sessions.items("history", session_id, max(total - limit, 0), total)}
+
+
+@app.post("/api/sessions/{session_id}/history")
+async def add_history(request: Request, session_id: str, payload: Dict[str, Any] = Body(...)):
+    """Append chat messages: {"messages": [{"role", "content", …}]}. Assistant
+    messages may carry an `id` and the answer's `images` and `sources`."""
+    check_session(session_id)
+    messages = payload.get("messages")
+    if not isinstance(messages, list) or not messages or not all(
+            isinstance(m, dict) and m.get("role") in ("user", "assistant")
+            and isinstance(m.get("content"), str) for m in messages):
+        raise HTTPException(status_code=422,
+                            detail="messages must be a non-empty list of {role, content}")
+    keep = ("id", "role", "content", "images", "sources")
+    total = await request.app.state.sessions.append(
+        "history", session_id, [{k: m[k] for k in keep if k in m} for m in messages])
+    return {"status": "ok", "session_id": session_id, "total": total}
+
+
+@app.get("/api/images/{image_id}")
+async def get_image(request: Request, image_id: str):
+    """Serve a page image by content hash. Ids never change meaning, so
+    clients may cache them forever."""
+    found = image_store.find(image_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Unknown image")
+    etag = f'"{image_id}"'
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    path, media_type = found
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(request: Request, job_id: str):
+    job = await request.app.state.jobs.lookup(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+@app.post("/api/jobs/{job_id}/progress")
+async def job_progress(request: Request, job_id: str,
+                       counters: Dict[str, Any] = Body(...)):
+    """Called by the loader flow's components while they run."""
+    if not await request.app.state.jobs.report(job_id, counters):
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return {"status": "ok"}
+
+
+@app.get("/api/cache/stats")
+async def cache_stats(request: Request):
+    return request.app.state.answers.stats()
+
+
+@app.post("/api/cache/invalidate")
+async def cache_invalidate(request: Request, session_id: str | None = None):
+    """For collections changed outside the backend (e.g. from the Langflow UI);
+    without `?session_id=` every session's answers are dropped, on every worker."""
+    request.app.state.answers.invalidate(session_id)
+    await request.app.state.sessions.incr("corpus", session_id or ".all")
+    return {"status": "ok", "session_id": session_id}
+
+
+@app.post("/api/tasks/events")
+async def task_events(request: Request, payload: Dict[str, Any] = Body(...)):
+    """Record Task-mode checklist events: one event, or {"events": [...]}.
+    Each has session_id, task_id (the item's number in its answer), status
+    ("completed" | "incomplete") and optionally answer_id (the chat message
+    the checklist came from), description, task_type, sop and ts (unix time)."""
+    events = payload.get("events", [payload])
+    if not isinstance(events, list) or not all(isinstance(e, dict) for e in events):
+        raise HTTPException(status_code=422, detail="events must be a list of objects")
+    try:
+        n = request.app.state.task_events.record(events)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"status": "queued", "events": n}
+
+
+@app.get("/api/tasks/stats")
+async def task_stats(request: Request, session_id: str | None = None,
+                     sop: str | None = None, task_type: str | None = None,
+                     since: float | None = None):
+    """Completion stats over the latest state of each task, by session,
+    task type and SOP; every filter is optional."""
+    return await asyncio.to_thread(request.app.state.task_events.stats,
+                                   session_id, sop, task_type, since)
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus scrape endpoint."""
+    cache = request.app.state.answers.stats()
+    slots = request.app.state.langflow.slot_stats()
+    extra = {
+        "ot_answer_cache_hits_total": ("counter", "Answer cache hits.", cache["hits"]),
+        "ot_answer_cache_misses_total": ("counter", "Answer cache misses.", cache["misses"]),
+        "ot_answer_cache_entries": ("gauge", "Cached answers.", cache["entries"]),
+        "ot_ingest_queue_depth": ("gauge", "Ingestion jobs waiting for a worker.",
+                                  request.app.state.jobs.queued()),
+        "ot_queries_inflight": ("gauge", "Admitted queries running or waiting for a slot.",
+                                request.app.state.scheduler.inflight),
+        "ot_langflow_slots_held": ("gauge", "Flow runs in flight.", slots["held"]),
+        "ot_langflow_slots_waiting": ("gauge", "Flow runs waiting for a slot.", slots["waiting"]),
+    }
+    return PlainTextResponse(telemetry.render_metrics(extra),
+                             media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/traces/{request_id}")
+async def get_trace(request_id: str):
+    """Spans of a recent request (X-Request-ID) or ingestion job (job_id)."""
+    trace = telemetry.get_trace(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Unknown trace")
+    return trace.to_dict()
+
+
+@app.get("/api/traces/{request_id}/profile")
+async def get_profile(request_id: str):
+    """Collapsed stacks (flamegraph.pl / speedscope) of a profiled request."""
+    trace = telemetry.get_trace(request_id)
+    if trace is None or trace.profile is None:
+        raise HTTPException(status_code=404, detail="No profile for this request")
+    return PlainTextResponse(trace.profile.collapsed())
+
+
+@app.post("/api/suggestions")
+async def suggestions(request: Request, payload: Dict[str, Any] = Body(...)):
+    """Follow-up questions for a chat turn from the session's question bank.
+    Body: session_id, and optionally query, answer, asked (earlier questions)
+    and k. Cheap enough to call right after the answer is shown."""
+    session_id = payload.get("session_id")
+    asked = payload.get("asked") or []
+    k = payload.get("k", config.SUGGESTION_COUNT)
+    if not isinstance(session_id, str) or not session_id or not isinstance(asked, list) \
+            or not isinstance(k, int):
+        raise HTTPException(status_code=422,
+                            detail="session_id (str) required; asked must be a list, k an int")
+    check_session(session_id)
+    questions = await request.app.state.questions.suggest(
+        session_id, str(payload.get("query") or ""), str(payload.get("answer") or ""),
+        [str(q) for q in asked], min(k, 10))
+    return {"session_id": session_id, "suggestions": questions}
+
+
+async def cached_answer(request: Request, session_id: str, query: str):
+    answers: AnswerCache = request.app.state.answers
+    with telemetry.span("answer_cache.get") as attrs:
+        answers.sync(session_id, await corpus_version(request, session_id))
+        lookup = await answers.get(session_id, query)
+        attrs["hit"] = lookup.hit
+    return lookup
+
+
+def flight_key(lookup) -> tuple:
+    """Identical questions against the same corpus version share a flow run."""
+    return lookup.session_id, lookup.query, lookup.version
+
+
+def query_args(payload: dict) -> tuple[str, str]:
+    """session_id and query of a query body; 422 when missing or invalid."""
+    session_id, query = payload.get("session_id"), payload.get("query")
+    if not isinstance(session_id, str) or not isinstance(query, str) or not query.strip():
+        raise HTTPException(status_code=422, detail="session_id and query (str) required")
+    check_session(session_id)
+    return session_id, query
+
+
+def flow_error(session_id: str, error: Any) -> JSONResponse:
+    return JSONResponse({"status": "error", "session_id": session_id, "error": str(error)},
+                        status_code=502)
+
+
+def answer_payload(session_id: str, answer: dict, t0: float, cached: bool = False) -> dict:
+    """The /api/query body: compact answer (see query_response) + request time."""
+    timings = {**answer["timings"], "total_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    return {"status": "success", "session_id": session_id, **answer,
+            "timings": timings, "cached": cached}
+
+
 @app.post("/api/query")
-async def query_text(payload: Dict[str, Any] = Body(...)):
-    flow_url = (
-        "http://127.0.0.1:7860/api/v1/run/6fae6f07-db9f-4501-a5b9-4a5a2edaaeae"
-    )
+async def query_text(request: Request, payload: Dict[str, Any] = Body(...)):
+    """Answer a question; returns answer, suggestions, sources, images and
+    timings (as msgpack with `Accept: application/x-msgpack`)."""
+    t0 = time.perf_counter()
+    answers: AnswerCache = request.app.state.answers
+    session_id, query = query_args(payload)
+    lookup = await cached_answer(request, session_id, query)
+    if lookup.hit:
+        return query_response.encode(request, answer_payload(session_id, lookup.response, t0, True))
+
+    scheduler: Scheduler = request.app.state.scheduler
+    key = flight_key(lookup)
+    if (flight := scheduler.follow(key)) is not None:
+        with telemetry.span("coalesced"):
+            answer = await asyncio.shield(flight)
+        if answer is None:
+            return flow_error(session_id, "the shared flow run failed")
+        return query_response.encode(
+            request, {**answer_payload(session_id, answer, t0), "coalesced": True})
 
-    langflow_resp = call_langflow(
-        payload["session_id"],
-        flow_url,
-        payload["query"],
+    release = scheduler.admit(session_id)
+    mine = scheduler.lead(key)
+    answer = None
+    try:
+        langflow_resp = await call_langflow(
+            request,
+            session_id,
+            config.QUERY_FLOW_ID,
+            query,
+            timeout=config.QUERY_TIMEOUT,
+            tweaks=query_tweaks(),
+        )
+        flow_s = time.perf_counter() - t0
+        if isinstance(langflow_resp, dict) and "error" in langflow_resp:
+            return flow_error(session_id, langflow_resp["error"])
+        with telemetry.span("normalize"):
+            answer = query_response.normalize(langflow_resp, flow_s)
+        answers.put(lookup, answer, flow_s)
+    finally:
+        scheduler.land(key, mine, answer)
+        release()
+    return query_response.encode(request, answer_payload(session_id, answer, t0))
+
+
+@app.post("/api/query/stream")
+async def query_stream(request: Request, payload: Dict[str, Any] = Body(...)):
+    """Same flow as /api/query, but forwards answer tokens as server-sent
+    events while Langflow generates them:
+
+        event: token  data: {"chunk": "..."}
+        event: end    data: {"session_id": ..., "answer": ..., <same fields as /api/query>}
+        event: error  data: {"error": "..."}
+    """
+    t0 = time.perf_counter()
+    client: LangflowClient = request.app.state.langflow
+    answers: AnswerCache = request.app.state.answers
+    session_id, query = query_args(payload)
+    lookup = await cached_answer(request, session_id, query)
+    scheduler: Scheduler = request.app.state.scheduler
+    key = flight_key(lookup)
+    flight = None if lookup.hit else scheduler.follow(key)
+    release, mine, started = None, None, False
+    if not lookup.hit and flight is None:
+        release = scheduler.admit(session_id)       # 429 before the stream starts
+        mine = scheduler.lead(key)
+
+    async def events():
+        nonlocal started
+        started = True
+        if lookup.hit:
+            yield sse("end", answer_payload(session_id, lookup.response, t0, True))
+            return
+        if flight is not None:
+            # the same question is already running: send its answer when done
+            answer = await asyncio.shield(flight)
+            if answer is None:
+                yield sse("error", {"error": "the shared flow run failed"})
+            else:
+                yield sse("end", {**answer_payload(session_id, answer, t0), "coalesced": True})
+            return
+        first, answer = True, None
+        try:
+            async for ev in client.stream(config.QUERY_FLOW_ID, session_id,
+                                          query, timeout=config.QUERY_TIMEOUT,
+                                          tweaks=query_tweaks()):
+                kind, data = ev.get("event"), ev.get("data") or {}
+                if kind == "token" and data.get("chunk"):
+                    if first:
+                        telemetry.TTFT.observe(time.perf_counter() - t0)
+                        first = False
+                    yield sse("token", {"chunk": data["chunk"]})
+                elif kind == "end":
+                    flow_s = time.perf_counter() - t0
+                    answer = query_response.normalize(data.get("result", data), flow_s)
+                    answers.put(lookup, answer, flow_s)
+                    scheduler.land(key, mine, answer)
+                    yield sse("end", answer_payload(session_id, answer, t0))
+                elif kind == "error":
+                    yield sse("error", {"error": data.get("error") or data.get("text", "")})
+        finally:
+            if answer is None:                      # failed or cut short
+                scheduler.land(key, mine)
+            release()
+
+    def cleanup() -> None:
+        # the generator may never start if the client hangs up first
+        if release is not None and not started:
+            scheduler.land(key, mine)
+            release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(cleanup),
     )
-    print(langflow_resp)
-    return {
-        "status": "success",
-        "session_id": payload["session_id"],
-        "response": langflow_resp  # <— now a dict or safe string
-    }
\ No newline at end of file
@@ -0,0 +1,146 @@
+# query_response.py  – the compact /api/query payload and its encodings
+#
+# The RAG flow's run result nests the answer several levels deep, next to
+# artifacts, logs and duplicate message copies. `normalize` reads it once
+# and keeps what clients use:
+#
+#   {"answer": str,                 markdown, without images / JSON / markers
+#    "suggestions": [str],          follow-up questions, if the flow still makes them
+#    "sources": [{"filename", "page"}],
+#    "images": [str],               /api/images/<id> (data: URIs for legacy chunks)
+#    "timings": {"flow_ms", "components": {component id: ms}}}
+#
+# `encode` picks msgpack or JSON from the Accept header; gzip is applied by
+# the GZip middleware when the client sends Accept-Encoding: gzip.
+
+import json
+import re
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+import config
+import telemetry
+from storage import display_name
+
+try:
+    import msgpack
+except ImportError:                 # optional: JSON only
+    msgpack = None
+
+MSGPACK = "application/x-msgpack"
+
+_SOURCES = re.compile(r"<!--sources:(.*?)-->", re.DOTALL)
+_JSON_BLOCK = re.compile(r"```json(.*?)```", re.DOTALL)
+_IMAGE_BLOCK = re.compile(
+    r"(?:<br>\s*)*<strong>Related images:</strong>\s*<ol[^>]*>.*?</ol>", re.DOTALL | re.IGNORECASE
+)
+_IMG_SRC = re.compile(r'<img[^>]+src="([^"]+)"', re.IGNORECASE)
+_LEGACY_B64 = re.compile(r"\[\s*\d+\s*,\s*'([A-Za-z0-9+/=]+)'\s*\]")
+
+
+def _outputs(result: Any) -> list[tuple[str, str]]:
+    """(component id, text) of every chat output in a run result, in output order."""
+    if isinstance(result, str):
+        return [("", result)]
+    found = []
+    for block in (result or {}).get("outputs", []) if isinstance(result, dict) else []:
+        for out in block.get("outputs", []):
+            msg = ((out or {}).get("results") or {}).get("message") or {}
+            text = msg.get("text") or (msg.get("data") or {}).get("text") or ""
+            if text:
+                found.append((str((out or {}).get("component_id") or ""), text))
+    return found
+
+
+def _messages(result: Any) -> list[str]:
+    """Text of every chat output in a run result, in output order."""
+    return [text for _, text in _outputs(result)]
+
+
+def _suggestion_items(texts: list[str]) -> list:
+    for text in texts:
+        candidates = [m.strip() for m in _JSON_BLOCK.findall(text)]
+        candidates.append(re.sub(r"^```json\s*|\s*```$", "", text.strip()))
+        for raw in candidates:
+            try:
+                parsed = json.loads(raw)
+            except ValueError:
+                continue
+            if isinstance(parsed, dict) and isinstance(parsed.get("suggestions"), list):
+                return [s for s in parsed["suggestions"] if s]
+    return []
+
+
+def _question(item: Any) -> str:
+    return str(item.get("question") or "") if isinstance(item, dict) else str(item)
+
+
+def suggestions(result: Any) -> list[dict]:
+    """Questions from a `{"suggestions": [...]}` block in a run result, as
+    {"question", "source"}; the loader's question-bank agent names the
+    SOP each one comes from, older flows give plain strings."""
+    return [{"question": _question(s), "source": str(s.get("source") or "") if isinstance(s, dict) else ""}
+            for s in _suggestion_items(_messages(result)) if _question(s)]
+
+
+def _sources(text: str) -> list[dict]:
+    out, seen = [], set()
+    for raw in _SOURCES.findall(text):
+        try:
+            items = json.loads(raw)
+        except ValueError:
+            continue
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            name = display_name(str(item.get("filename") or ""))
+            key = (name, item.get("page"))
+            if name and key not in seen:
+                seen.add(key)
+                out.append({"filename": name, "page": item.get("page")})
+    return out
+
+
+def _image_ref(src: str) -> str:
+    if src.startswith("data:image/png;base64,"):
+        payload = src.split(",", 1)[1]
+        if m := _LEGACY_B64.match(payload):
+            return "data:image/png;base64," + m.group(1)
+    return src
+
+
+def normalize(result: Any, flow_s: float | None = None,
+              answer_node: str = config.QUERY_ANSWER_NODE) -> dict:
+    """Compact payload from a RAG flow run result (dict or plain string).
+    The answer is the output of `answer_node`, or the first one when the
+    run has no output from that component."""
+    outputs = _outputs(result)
+    texts = [text for _, text in outputs]
+    i = next((n for n, (cid, _) in enumerate(outputs) if cid == answer_node), 0)
+    raw = texts[i] if texts else ""
+    others = texts[:i] + texts[i + 1:]
+    answer = _SOURCES.sub("", raw)
+    answer = _JSON_BLOCK.sub("", answer)
+    images = [_image_ref(src) for src in _IMG_SRC.findall(answer)]
+    answer = _IMAGE_BLOCK.sub("", answer)
+    answer = re.sub(r"<img[^>]*>", "", answer, flags=re.IGNORECASE).strip()
+    return {
+        "answer": answer,
+        "suggestions": [q for q in map(_question, _suggestion_items(others + texts[i:i + 1])) if q],
+        "sources": _sources(raw),
+        "images": list(dict.fromkeys(images)),
+        "timings": {
+            "flow_ms": round(flow_s * 1000, 1) if flow_s is not None else None,
+            "components": {c: round(s * 1000, 1)
+                           for c, s in telemetry.component_timings(result)},
+        },
+    }
+
+
+def encode(request: Request, payload: dict) -> Response:
+    """msgpack when the client asks for it (and it is installed), else JSON."""
+    if msgpack is not None and MSGPACK in request.headers.get("accept", ""):
+        return Response(msgpack.packb(payload, use_bin_type=True), media_type=MSGPACK)
+    return JSONResponse(payload)
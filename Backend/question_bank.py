@@ -0,0 +1,90 @@
+# question_bank.py  – per-session follow-up questions, built at ingestion
+#
+# The loader flow's agent reads a token-budgeted overview of the SOPs an
+# ingestion run touched and proposes questions, each tagged with its source
+# file. They are kept in the session store (session_store.py), and the
+# suggestions for a chat turn are a ranking of that bank against the
+# question and answer – no LLM generation on the answer's critical path.
+
+import re
+from typing import Iterable
+
+import config
+from storage import display_name
+
+_WORD = re.compile(r"[A-Za-z0-9][\w\-./]*[A-Za-z0-9]|[A-Za-z0-9]")
+_CODE = re.compile(r"\b[A-Z]{1,4}-?\d{2,}\b|\b\d+(?:\.\d+){2,}\b")   # F-0231, 10.0.3.1
+_STOP = set("the and for with that this from what how does are was were can you your "
+            "into when where which who why will should would could have has had not".split())
+
+
+def _key(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s-]", " ", text.lower()).split())
+
+
+def _terms(text: str) -> set[str]:
+    return {w.lower() for w in _WORD.findall(text) if len(w) > 2} - _STOP
+
+
+class QuestionBank:
+    """Questions per session, as [{"question", "source"}] with `source` the
+    stored file name, kept in the shared session store ("questions")."""
+
+    def __init__(self, store, limit: int = config.QUESTION_BANK_MAX):
+        self.store, self.limit = store, limit
+
+    async def load(self, session_id: str) -> list[dict]:
+        questions = await self.store.get("questions", session_id)
+        return questions if isinstance(questions, list) else []
+
+    async def update(self, session_id: str, present: Iterable[str], files: list[str],
+                     items: list[dict]) -> int:
+        """Merge one loader run's questions: they replace the earlier ones of
+        the same source file, and questions of files no longer `present` are
+        dropped. Sources the agent names by display name are mapped to the
+        stored <timestamp>_<name>; unknown ones go to the run's file when it
+        read just one. Returns the bank size."""
+        present = set(present)
+        by_display = {display_name(f): f for f in sorted(present)}
+        fresh, seen = [], set()
+        for item in items:
+            source = item.get("source", "")
+            source = source if source in present else by_display.get(display_name(source), "")
+            if not source and len(files) == 1:
+                source = files[0]
+            key = _key(item["question"])
+            if key and key not in seen:
+                seen.add(key)
+                fresh.append({"question": item["question"], "source": source})
+
+        replaced = {q["source"] for q in fresh}
+        old = await self.load(session_id)
+        kept = [q for q in old
+                if q.get("source") in present and q.get("source") not in replaced
+                and _key(q.get("question", "")) not in seen]
+        questions = (fresh + kept)[: self.limit]
+        if questions or old:
+            await self.store.put("questions", session_id, questions)
+        return len(questions)
+
+    async def suggest(self, session_id: str, query: str = "", answer: str = "",
+                      asked: Iterable[str] = (), k: int = config.SUGGESTION_COUNT) -> list[str]:
+        """Top `k` bank questions for a chat turn: overlap with the question
+        counts twice, with the answer once, shared fault codes most. Already
+        asked questions are skipped; with no overlap the bank's order wins."""
+        bank = await self.load(session_id)
+        if not bank or k <= 0:
+            return []
+        q_terms, a_terms = _terms(query), _terms(answer)
+        codes = set(_CODE.findall(query)) | set(_CODE.findall(answer))
+        skip = {_key(q) for q in asked} | {_key(query)}
+        scored = []
+        for i, item in enumerate(bank):
+            question = item.get("question", "")
+            terms = _terms(question)
+            if not terms or _key(question) in skip:
+                continue
+            score = (2 * len(terms & q_terms) + len(terms & a_terms)
+                     + 3 * len(codes & set(_CODE.findall(question)))) / len(terms) ** 0.5
+            scored.append((-score, i, question))
+        return [q for _, _, q in sorted(scored)[:k]]
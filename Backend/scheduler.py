@@ -0,0 +1,168 @@
+# scheduler.py  – admission control, request coalescing and priority slots
+#
+# Three layers in front of Langflow:
+#   * coalescing – identical questions in flight (same session corpus, same
+#     normalised text) share one flow run;
+#   * admission  – per-session and global caps on queries in flight or
+#     waiting, rejected at once with 429 instead of queueing without bound;
+#   * priority   – flow-run slots go to interactive chat before bulk
+#     ingestion, and ingestion never holds more than its share of them.
+
+import asyncio
+import heapq
+import itertools
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Hashable
+
+import config
+import telemetry
+
+INTERACTIVE, BULK = 0, 1
+PRIORITIES = {"interactive": INTERACTIVE, "bulk": BULK}
+
+REJECTED = telemetry.CounterMetric("ot_scheduler_rejected_total",
+                                   "Queries rejected with 429.", ("reason",))
+COALESCED = telemetry.CounterMetric("ot_scheduler_coalesced_total",
+                                    "Queries answered by another request's flow run.")
+
+
+class Overloaded(Exception):
+    """Raised by `Scheduler.admit`; the API turns it into a 429."""
+
+    def __init__(self, reason: str, retry_after: float = config.RETRY_AFTER_S):
+        super().__init__(reason)
+        self.reason, self.retry_after = reason, retry_after
+
+
+class PrioritySlots:
+    """Semaphore whose waiters are served by priority class, then FIFO.
+
+    Bulk holders are capped at `bulk_limit`, so interactive runs always
+    find a free slot within one bulk run's time.
+    """
+
+    def __init__(self, capacity: int = config.MAX_CONCURRENCY,
+                 bulk_limit: int = config.BULK_MAX_CONCURRENCY):
+        self.capacity = capacity
+        self._limits = {INTERACTIVE: capacity, BULK: max(1, min(bulk_limit, capacity))}
+        self._held = {INTERACTIVE: 0, BULK: 0}
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @property
+    def held(self) -> int:
+        return sum(self._held.values())
+
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def _free_for(self, prio: int) -> bool:
+        return self.held < self.capacity and self._held[prio] < self._limits[prio]
+
+    async def acquire(self, priority: str = "interactive") -> None:
+        prio = PRIORITIES[priority]
+        queued_ahead = any(p <= prio and not f.done() for p, _, f in self._waiters)
+        if not queued_ahead and self._free_for(prio):
+            self._held[prio] += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (prio, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():      # granted, then cancelled
+                self.release(priority)
+            raise
+
+    def release(self, priority: str = "interactive") -> None:
+        self._held[PRIORITIES[priority]] -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            prio, _, fut = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            # interactive waiters sort first; if the head can't go, nobody can
+            if not self._free_for(prio):
+                return
+            heapq.heappop(self._waiters)
+            self._held[prio] += 1
+            fut.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive"):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+
+class Scheduler:
+    """Admission and coalescing for query routes (cache hits bypass both)."""
+
+    def __init__(
+        self,
+        global_limit: int = config.MAX_CONCURRENCY + config.QUERY_QUEUE_LIMIT,
+        session_limit: int = config.SESSION_MAX_INFLIGHT,
+    ):
+        self.global_limit, self.session_limit = global_limit, session_limit
+        self.inflight = 0
+        self._sessions: defaultdict[str, int] = defaultdict(int)
+        self._flights: dict[Hashable, asyncio.Future] = {}
+
+    # ── admission ────────────────────────────────────────────────────────
+    def admit(self, session_id: str) -> Callable[[], None]:
+        """Reserve room for one flow run or raise Overloaded; call the
+        returned function (idempotent) once the run is over."""
+        if self.inflight >= self.global_limit:
+            REJECTED.inc("global")
+            raise Overloaded("server busy")
+        if self._sessions[session_id] >= self.session_limit:
+            REJECTED.inc("session")
+            raise Overloaded("too many questions in flight for this session")
+        self.inflight += 1
+        self._sessions[session_id] += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            self.inflight -= 1
+            self._sessions[session_id] -= 1
+            if not self._sessions[session_id]:
+                del self._sessions[session_id]
+
+        return release
+
+    # ── coalescing ───────────────────────────────────────────────────────
+    def follow(self, key: Hashable) -> asyncio.Future | None:
+        """The in-flight run for `key`, if any; await it with asyncio.shield.
+        It resolves to the answer, or None when the leading run failed."""
+        flight = self._flights.get(key)
+        if flight is not None:
+            COALESCED.inc()
+        return flight
+
+    def lead(self, key: Hashable) -> asyncio.Future:
+        """Start the flight for `key`; hand it back to `land`."""
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        return flight
+
+    def land(self, key: Hashable, flight: asyncio.Future, answer: Any = None) -> None:
+        """Hand the result to every follower of `flight`. A later flight for
+        the same key (led after this one landed) is left alone."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.done():
+            flight.set_result(answer)
+
+    def stats(self) -> dict:
+        return {"inflight": self.inflight, "sessions": len(self._sessions),
+                "coalescing": len(self._flights)}
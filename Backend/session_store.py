@@ -0,0 +1,225 @@
+# session_store.py  – session state shared by every backend worker
+#
+# Chat histories, each session's file list, ingestion job status, the
+# question bank and per-session corpus versions live here instead of in one
+# process (or in the Streamlit session), so several uvicorn workers and
+# replicas behind a load balancer see the same sessions:
+#   * SQLiteSessionStore – one file (WAL); fine for workers on one host
+#   * RedisSessionStore  – any Redis-compatible server, for several hosts
+# Values are JSON. Keys live in namespaces ("history", "files", "jobs", …);
+# a key holds either a document (get/put), a list (append/items) or a
+# counter (incr).
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+import config
+
+try:                                    # only needed for SESSION_STORE=redis://…
+    import redis.asyncio as aioredis
+except ImportError:                     # pragma: no cover – optional dependency
+    aioredis = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns      TEXT NOT NULL,
+    key     TEXT NOT NULL,
+    value   TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+);
+CREATE TABLE IF NOT EXISTS lists (
+    id      INTEGER PRIMARY KEY,
+    ns      TEXT NOT NULL,
+    key     TEXT NOT NULL,
+    value   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lists_key ON lists (ns, key, id);
+CREATE TABLE IF NOT EXISTS claims (
+    name    TEXT PRIMARY KEY,
+    owner   TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class SQLiteSessionStore:
+    """Session store in one SQLite file. Every worker opens its own
+    connection; WAL lets them read while another commits."""
+
+    def __init__(self, path: str = config.SESSION_STORE):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()           # one statement at a time per connection
+
+    def _run(self, sql: str, args: tuple = (), fetch: str = "") -> Any:
+        with self._lock, self._db:
+            cur = self._db.execute(sql, args)
+            if fetch == "one":
+                return cur.fetchone()
+            if fetch == "all":
+                return cur.fetchall()
+            return cur.rowcount
+
+    async def _call(self, sql: str, args: tuple = (), fetch: str = "") -> Any:
+        return await asyncio.to_thread(self._run, sql, args, fetch)
+
+    async def close(self) -> None:
+        self._db.close()
+
+    # ── documents ────────────────────────────────────────────────────────
+    async def get(self, ns: str, key: str) -> Any:
+        row = await self._call("SELECT value FROM kv WHERE ns = ? AND key = ?", (ns, key), "one")
+        return json.loads(row[0]) if row else None
+
+    async def put(self, ns: str, key: str, value: Any) -> None:
+        await self._call(
+            "INSERT INTO kv (ns, key, value, updated) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (ns, key) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+            (ns, key, json.dumps(value), time.time()))
+
+    async def delete(self, ns: str, key: str) -> None:
+        await self._call("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key))
+        await self._call("DELETE FROM lists WHERE ns = ? AND key = ?", (ns, key))
+
+    async def keys(self, ns: str) -> list[str]:
+        """Document and counter keys of a namespace, oldest write first."""
+        rows = await self._call("SELECT key FROM kv WHERE ns = ? ORDER BY updated", (ns,), "all")
+        return [r[0] for r in rows]
+
+    async def incr(self, ns: str, key: str) -> int:
+        """Atomically bump a counter (created at 1); returns the new value."""
+        row = await self._call(
+            "INSERT INTO kv (ns, key, value, updated) VALUES (?, ?, '1', ?)"
+            " ON CONFLICT (ns, key) DO UPDATE SET value = CAST(value AS INTEGER) + 1,"
+            "  updated = excluded.updated RETURNING value",
+            (ns, key, time.time()), "one")
+        return int(row[0])
+
+    # ── lists ────────────────────────────────────────────────────────────
+    async def append(self, ns: str, key: str, values: list) -> int:
+        """Add values to the end of a list; returns its new length."""
+        def run() -> int:
+            with self._lock, self._db:
+                self._db.executemany("INSERT INTO lists (ns, key, value) VALUES (?, ?, ?)",
+                                     [(ns, key, json.dumps(v)) for v in values])
+                return self._db.execute("SELECT COUNT(*) FROM lists WHERE ns = ? AND key = ?",
+                                        (ns, key)).fetchone()[0]
+        return await asyncio.to_thread(run)
+
+    async def items(self, ns: str, key: str, start: int = 0, stop: int | None = None) -> list:
+        """list[start:stop] for non-negative bounds."""
+        limit = -1 if stop is None else max(stop - start, 0)
+        rows = await self._call(
+            "SELECT value FROM lists WHERE ns = ? AND key = ? ORDER BY id LIMIT ? OFFSET ?",
+            (ns, key, limit, start), "all")
+        return [json.loads(r[0]) for r in rows]
+
+    async def length(self, ns: str, key: str) -> int:
+        row = await self._call("SELECT COUNT(*) FROM lists WHERE ns = ? AND key = ?",
+                               (ns, key), "one")
+        return row[0]
+
+    # ── claims ───────────────────────────────────────────────────────────
+    async def claim(self, name: str, owner: str, ttl: float) -> bool:
+        """Take (or renew) a named lease unless another owner holds a live one."""
+        now = time.time()
+        changed = await self._call(
+            "INSERT INTO claims (name, owner, expires) VALUES (?, ?, ?)"
+            " ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires"
+            " WHERE claims.owner = excluded.owner OR claims.expires < ?",
+            (name, owner, now + ttl, now))
+        return changed > 0
+
+    async def release(self, name: str, owner: str) -> None:
+        await self._call("DELETE FROM claims WHERE name = ? AND owner = ?", (name, owner))
+
+
+class RedisSessionStore:
+    """The same API on a Redis-compatible server (Redis, Valkey, KeyDB …).
+    Keys are `<prefix><ns>:<key>`; each namespace keeps a sorted set of its
+    document keys so `keys()` needs no SCAN."""
+
+    _RELEASE = ("if redis.call('get', KEYS[1]) == ARGV[1] then "
+                "return redis.call('del', KEYS[1]) else return 0 end")
+
+    def __init__(self, url: str = config.SESSION_STORE, prefix: str = config.SESSION_STORE_PREFIX):
+        if aioredis is None:
+            raise RuntimeError("SESSION_STORE is a redis:// URL but the `redis` package is not installed")
+        self._r = aioredis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+
+    def _k(self, ns: str, key: str) -> str:
+        return f"{self._prefix}{ns}:{key}"
+
+    def _index(self, ns: str) -> str:
+        return f"{self._prefix}{ns}"
+
+    async def close(self) -> None:
+        await self._r.aclose()
+
+    async def get(self, ns: str, key: str) -> Any:
+        raw = await self._r.get(self._k(ns, key))
+        return json.loads(raw) if raw is not None else None
+
+    async def put(self, ns: str, key: str, value: Any) -> None:
+        async with self._r.pipeline(transaction=True) as p:
+            p.set(self._k(ns, key), json.dumps(value))
+            p.zadd(self._index(ns), {key: time.time()})
+            await p.execute()
+
+    async def delete(self, ns: str, key: str) -> None:
+        async with self._r.pipeline(transaction=True) as p:
+            p.delete(self._k(ns, key), self._k(ns, key) + ":list")
+            p.zrem(self._index(ns), key)
+            await p.execute()
+
+    async def keys(self, ns: str) -> list[str]:
+        return await self._r.zrange(self._index(ns), 0, -1)
+
+    async def incr(self, ns: str, key: str) -> int:
+        async with self._r.pipeline(transaction=True) as p:
+            p.incr(self._k(ns, key))
+            p.zadd(self._index(ns), {key: time.time()})
+            value, _ = await p.execute()
+        return int(value)
+
+    async def append(self, ns: str, key: str, values: list) -> int:
+        return await self._r.rpush(self._k(ns, key) + ":list", *map(json.dumps, values))
+
+    async def items(self, ns: str, key: str, start: int = 0, stop: int | None = None) -> list:
+        end = -1 if stop is None else stop - 1
+        if stop is not None and stop <= start:
+            return []
+        return [json.loads(v) for v in await self._r.lrange(self._k(ns, key) + ":list", start, end)]
+
+    async def length(self, ns: str, key: str) -> int:
+        return await self._r.llen(self._k(ns, key) + ":list")
+
+    async def claim(self, name: str, owner: str, ttl: float) -> bool:
+        key = self._k("claims", name)
+        if await self._r.set(key, owner, nx=True, px=int(ttl * 1000)):
+            return True
+        if await self._r.get(key) == owner:         # renew our own lease
+            return bool(await self._r.set(key, owner, xx=True, px=int(ttl * 1000)))
+        return False
+
+    async def release(self, name: str, owner: str) -> None:
+        await self._r.eval(self._RELEASE, 1, self._k("claims", name), owner)
+
+
+def open_store(url: str = config.SESSION_STORE):
+    """`redis://` / `rediss://` URLs → Redis, anything else is a SQLite path."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url)
+    return SQLiteSessionStore(url.removeprefix("sqlite:///"))
@@ -0,0 +1,298 @@
+# storage.py  – where uploaded SOPs live: local disk or an S3-compatible bucket
+#
+# Langflow's loader reads a session's files from a folder, so every backend
+# exposes one per session (`folder`) and makes it current before a loader
+# run (`stage`):
+#   * LocalStorage – files in <UPLOAD_DIR>/<session_id>/. With several
+#     workers or replicas UPLOAD_DIR has to be a volume they and Langflow
+#     share; stage/commit have nothing to do.
+#   * S3Storage    – objects <prefix><session_id>/<name> in a bucket (AWS S3,
+#     MinIO, Ceph, … or benchmarks/stub_s3.py). Only the bucket is shared:
+#     `stage` mirrors a session into STAGING_DIR on the Langflow host before
+#     a run, and `commit` uploads the ingest manifest the run wrote there.
+# Requests are signed with AWS Signature V4 over the backend's httpx, so no
+# AWS SDK is needed.
+
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import AsyncIterator
+from urllib.parse import quote, urlsplit
+
+import httpx
+from fastapi import UploadFile
+
+import config
+
+_SAFE = "-_.~"
+_STAMPED = re.compile(r"^\d{8}_\d{6}_(.+)$")     # uploads are stored as <timestamp>_<name>
+
+
+def valid_name(name: str) -> bool:
+    """A plain file name: no path parts, not one of our dot-files."""
+    return bool(name) and os.path.basename(name) == name and not name.startswith(".")
+
+
+def display_name(name: str) -> str:
+    """The uploaded file name of a stored <timestamp>_<name>."""
+    m = _STAMPED.match(name)
+    return m.group(1) if m else name
+
+
+def previous_versions(names: list[str], original: str) -> list[str]:
+    """Earlier uploads of the same file name."""
+    return [n for n in names if (m := _STAMPED.match(n)) and m.group(1) == original]
+
+
+class LocalStorage:
+    """Session folders on a (shared) filesystem."""
+
+    def __init__(self, root: str = config.UPLOAD_DIR):
+        self.root = root
+
+    def folder(self, session_id: str) -> str:
+        return os.path.abspath(os.path.join(self.root, session_id))
+
+    async def stage(self, session_id: str) -> str:
+        os.makedirs(self.folder(session_id), exist_ok=True)
+        return self.folder(session_id)
+
+    async def commit(self, session_id: str) -> None:
+        pass
+
+    async def save(self, session_id: str, name: str, file: UploadFile) -> int:
+        """Stream an upload to disk; returns its size."""
+        os.makedirs(self.folder(session_id), exist_ok=True)
+        path = os.path.join(self.folder(session_id), name)
+        size = 0
+        with open(path + ".part", "wb") as f:
+            while chunk := await file.read(config.UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+        await asyncio.to_thread(os.replace, path + ".part", path)
+        return size
+
+    async def names(self, session_id: str) -> list[str]:
+        folder = self.folder(session_id)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(n for n in os.listdir(folder)
+                      if valid_name(n) and not n.endswith(".part")
+                      and os.path.isfile(os.path.join(folder, n)))
+
+    async def size(self, session_id: str, name: str) -> int | None:
+        try:
+            return os.path.getsize(os.path.join(self.folder(session_id), name))
+        except OSError:
+            return None
+
+    async def iter_bytes(self, session_id: str, name: str) -> AsyncIterator[bytes]:
+        with open(os.path.join(self.folder(session_id), name), "rb") as f:
+            while chunk := await asyncio.to_thread(f.read, config.UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+    async def delete(self, session_id: str, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.folder(session_id), name))
+        except FileNotFoundError:
+            pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+class S3Storage:
+    """Session files as objects in an S3-compatible bucket (path-style URLs)."""
+
+    def __init__(
+        self,
+        bucket: str = config.S3_BUCKET,
+        endpoint: str = config.S3_ENDPOINT_URL,
+        prefix: str = config.S3_PREFIX,
+        region: str = config.S3_REGION,
+        access_key: str = config.S3_ACCESS_KEY,
+        secret_key: str = config.S3_SECRET_KEY,
+        staging_dir: str = config.STAGING_DIR,
+    ):
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        self.bucket, self.prefix, self.region = bucket, prefix, region
+        self.endpoint = endpoint or f"https://s3.{region}.amazonaws.com"
+        self._access, self._secret = access_key, secret_key
+        self.staging_dir = staging_dir
+        self._host = urlsplit(self.endpoint).netloc
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(config.S3_TIMEOUT, connect=config.CONNECT_TIMEOUT))
+
+    # ── signing ──────────────────────────────────────────────────────────
+    def _request(self, method: str, key: str = "", query: dict | None = None,
+                 headers: dict | None = None, **kwargs) -> httpx.Request:
+        """A request signed with AWS Signature V4 (unsigned payload)."""
+        path = "/" + quote(self.bucket, safe=_SAFE) + ("/" + quote(key, safe="/" + _SAFE) if key else "")
+        qs = "&".join(f"{quote(k, safe=_SAFE)}={quote(str(v), safe=_SAFE)}"
+                      for k, v in sorted((query or {}).items()))
+        now = datetime.now(timezone.utc)
+        amz_date, day = now.strftime("%Y%m%dT%H%M%SZ"), now.strftime("%Y%m%d")
+        signed = {"host": self._host, "x-amz-content-sha256": "UNSIGNED-PAYLOAD",
+                  "x-amz-date": amz_date}
+        canonical = "\n".join([
+            method, path, qs,
+            "".join(f"{k}:{v}\n" for k, v in sorted(signed.items())),
+            ";".join(sorted(signed)),
+            "UNSIGNED-PAYLOAD",
+        ])
+        scope = f"{day}/{self.region}/s3/aws4_request"
+        to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope,
+                             hashlib.sha256(canonical.encode()).hexdigest()])
+        signing_key = ("AWS4" + self._secret).encode()
+        for part in (day, self.region, "s3", "aws4_request"):
+            signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(signing_key, to_sign.encode(), hashlib.sha256).hexdigest()
+        headers = {**(headers or {}), **signed, "authorization":
+                   f"AWS4-HMAC-SHA256 Credential={self._access}/{scope}, "
+                   f"SignedHeaders={';'.join(sorted(signed))}, Signature={signature}"}
+        url = self.endpoint + path + ("?" + qs if qs else "")
+        return self._client.build_request(method, url, headers=headers, **kwargs)
+
+    async def _send(self, method: str, key: str = "", ok: tuple = (200, 204), **kwargs) -> httpx.Response:
+        resp = await self._client.send(self._request(method, key, **kwargs))
+        if resp.status_code not in ok:
+            raise RuntimeError(f"S3 {method} {key or self.bucket}: HTTP {resp.status_code} {resp.text[:200]}")
+        return resp
+
+    def _key(self, session_id: str, name: str) -> str:
+        return f"{self.prefix}{session_id}/{name}"
+
+    async def _list(self, session_id: str) -> dict[str, str]:
+        """{name: etag} of every object in the session, dot-files included."""
+        base = self._key(session_id, "")
+        out, token = {}, None
+        while True:
+            query = {"list-type": "2", "prefix": base}
+            if token:
+                query["continuation-token"] = token
+            root = ET.fromstring((await self._send("GET", query=query)).content)
+            ns = root.tag[: root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+            for item in root.iter(f"{ns}Contents"):
+                name = item.findtext(f"{ns}Key", "")[len(base):]
+                if name and "/" not in name:
+                    out[name] = item.findtext(f"{ns}ETag", "").strip('"')
+            token = root.findtext(f"{ns}NextContinuationToken")
+            if root.findtext(f"{ns}IsTruncated") != "true" or not token:
+                return out
+
+    # ── staging ──────────────────────────────────────────────────────────
+    def folder(self, session_id: str) -> str:
+        return os.path.abspath(os.path.join(self.staging_dir, session_id))
+
+    def _staged_path(self, session_id: str) -> str:
+        return os.path.join(self.folder(session_id), ".staged.json")
+
+    def _read_staged(self, session_id: str) -> dict[str, str]:
+        try:
+            with open(self._staged_path(session_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_staged(self, session_id: str, staged: dict[str, str]) -> None:
+        path = self._staged_path(session_id)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(staged, f)
+        os.replace(path + ".tmp", path)
+
+    async def stage(self, session_id: str) -> str:
+        """Mirror the session's objects into its staging folder: download new
+        or changed ones (by ETag), remove files deleted from the bucket."""
+        folder = self.folder(session_id)
+        os.makedirs(folder, exist_ok=True)
+        remote = await self._list(session_id)
+        staged = self._read_staged(session_id)
+        for name, etag in remote.items():
+            path = os.path.join(folder, name)
+            if staged.get(name) == etag and os.path.isfile(path):
+                continue
+            resp = await self._client.send(self._request("GET", self._key(session_id, name)),
+                                           stream=True)
+            try:
+                if resp.status_code != 200:
+                    raise RuntimeError(f"S3 GET {name}: HTTP {resp.status_code}")
+                with open(path + ".part", "wb") as f:
+                    async for chunk in resp.aiter_bytes(config.UPLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+            finally:
+                await resp.aclose()
+            os.replace(path + ".part", path)
+            staged[name] = etag
+        for name in list(staged):
+            if name not in remote:
+                staged.pop(name)
+                try:
+                    os.remove(os.path.join(folder, name))
+                except FileNotFoundError:
+                    pass
+        self._write_staged(session_id, staged)
+        return folder
+
+    async def commit(self, session_id: str) -> None:
+        """Upload the ingest manifest a loader run left in the staging folder."""
+        path = os.path.join(self.folder(session_id), config.MANIFEST_NAME)
+        if not os.path.isfile(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        resp = await self._send("PUT", self._key(session_id, config.MANIFEST_NAME), content=data)
+        staged = self._read_staged(session_id)
+        staged[config.MANIFEST_NAME] = resp.headers.get("etag", "").strip('"')
+        self._write_staged(session_id, staged)
+
+    # ── files ────────────────────────────────────────────────────────────
+    async def save(self, session_id: str, name: str, file: UploadFile) -> int:
+        """Stream an upload into the bucket (one PUT); returns its size."""
+        size = file.size
+        if size is None:                # spooled by Starlette, so seekable
+            size = await asyncio.to_thread(file.file.seek, 0, os.SEEK_END)
+            await file.seek(0)
+
+        async def body():
+            while chunk := await file.read(config.UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+        await self._send("PUT", self._key(session_id, name), content=body(),
+                         headers={"content-length": str(size)})
+        return size
+
+    async def names(self, session_id: str) -> list[str]:
+        return sorted(n for n in await self._list(session_id) if valid_name(n))
+
+    async def size(self, session_id: str, name: str) -> int | None:
+        resp = await self._send("HEAD", self._key(session_id, name), ok=(200, 404))
+        return int(resp.headers.get("content-length", 0)) if resp.status_code == 200 else None
+
+    async def iter_bytes(self, session_id: str, name: str) -> AsyncIterator[bytes]:
+        resp = await self._client.send(self._request("GET", self._key(session_id, name)), stream=True)
+        try:
+            async for chunk in resp.aiter_bytes(config.UPLOAD_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await resp.aclose()
+
+    async def delete(self, session_id: str, name: str) -> None:
+        await self._send("DELETE", self._key(session_id, name), ok=(200, 204, 404))
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def open_storage(backend: str = config.STORAGE_BACKEND):
+    if backend == "s3":
+        return S3Storage()
+    if backend != "local":
+        raise RuntimeError(f"STORAGE_BACKEND must be 'local' or 's3', not {backend!r}")
+    return LocalStorage()
+
@@ -0,0 +1,258 @@
+# task_events.py  – Task-mode checklist events and completion stats
+#
+# Every checkbox change in the UI's Task mode is one event. Events are
+# buffered in memory and written to SQLite (WAL, so dashboards read while
+# the writer commits) in batches; each flush also upserts `task_state`, the
+# latest status per (session, task), which the stats queries aggregate
+# instead of rescanning the whole event log.
+
+import asyncio
+import csv
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any
+
+import config
+
+STATUSES = ("completed", "incomplete")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_events (
+    id          INTEGER PRIMARY KEY,
+    ts          REAL NOT NULL,
+    session_id  TEXT NOT NULL,
+    answer_id   TEXT NOT NULL DEFAULT '',
+    task_id     INTEGER NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    task_type   TEXT NOT NULL DEFAULT 'General',
+    sop         TEXT NOT NULL DEFAULT '',
+    status      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS task_events_ts ON task_events (ts);
+
+CREATE TABLE IF NOT EXISTS task_state (
+    session_id  TEXT NOT NULL,
+    answer_id   TEXT NOT NULL,
+    task_id     INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    task_type   TEXT NOT NULL,
+    sop         TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (session_id, answer_id, task_id)
+);
+CREATE INDEX IF NOT EXISTS task_state_type ON task_state (task_type);
+CREATE INDEX IF NOT EXISTS task_state_sop ON task_state (sop);
+CREATE INDEX IF NOT EXISTS task_state_updated ON task_state (updated_at);
+"""
+
+# created after the migration, which adds answer_id to older databases
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS task_events_session ON task_events (session_id, answer_id, task_id, ts);
+"""
+
+_COLUMNS = ("ts", "session_id", "answer_id", "task_id", "description", "task_type", "sop",
+            "status")
+
+
+def _migrate(db: sqlite3.Connection) -> None:
+    """Databases from before answer_id: tasks were keyed by their number in
+    the latest answer alone. Old rows keep an empty answer_id."""
+    if "answer_id" in {r[1] for r in db.execute("PRAGMA table_info(task_events)")}:
+        return
+    with db:
+        db.execute("ALTER TABLE task_events ADD COLUMN answer_id TEXT NOT NULL DEFAULT ''")
+        db.execute("DROP INDEX IF EXISTS task_events_session")
+        db.execute("ALTER TABLE task_state RENAME TO task_state_old")
+        for index in ("task_state_type", "task_state_sop", "task_state_updated"):
+            db.execute(f"DROP INDEX IF EXISTS {index}")
+        for stmt in filter(str.strip, _SCHEMA.split(";")):
+            db.execute(stmt)
+        db.execute("INSERT INTO task_state SELECT session_id, '', task_id, description,"
+                   " task_type, sop, status, updated_at FROM task_state_old")
+        db.execute("DROP TABLE task_state_old")
+
+
+def validate(event: dict[str, Any]) -> tuple:
+    """Event dict → row tuple; raises ValueError on a malformed event.
+    `task_id` is the item's number within the answer `answer_id` (the chat
+    message the checklist came from), so tasks of different answers in one
+    session are kept apart."""
+    if not event.get("session_id"):
+        raise ValueError("session_id is required")
+    if event.get("status") not in STATUSES:
+        raise ValueError(f"status must be one of {STATUSES}")
+    try:
+        task_id = int(event["task_id"])
+        ts = float(event.get("ts") or time.time())
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("task_id must be an integer and ts a unix time") from None
+    return (
+        ts,
+        str(event["session_id"]),
+        str(event.get("answer_id") or ""),
+        task_id,
+        str(event.get("description") or ""),
+        str(event.get("task_type") or "General"),
+        str(event.get("sop") or ""),
+        event["status"],
+    )
+
+
+class TaskEventStore:
+    """Batched writer + indexed completion stats over one SQLite file."""
+
+    def __init__(
+        self,
+        path: str = config.TASK_EVENTS_DB,
+        batch_size: int = config.TASK_EVENTS_BATCH,
+        flush_interval: float = config.TASK_EVENTS_FLUSH_INTERVAL,
+    ):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.batch_size, self.flush_interval = batch_size, flush_interval
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        _migrate(self._db)
+        self._db.executescript(_INDEXES)
+        # stats run in worker threads (one at a time) while a flush commits
+        self._read = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._read_lock = threading.Lock()
+        self._buffer: list[tuple] = []
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()            # one flush at a time
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+        self._read.close()
+        self._db.close()
+
+    # ── writes ───────────────────────────────────────────────────────────
+    def record(self, events: list[dict[str, Any]]) -> int:
+        """Validate and buffer events; they are committed by the next flush."""
+        rows = [validate(e) for e in events]
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.batch_size:
+            self._full.set()
+        return len(rows)
+
+    async def flush(self) -> int:
+        async with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except sqlite3.Error:
+                self._buffer[:0] = rows
+                raise
+            return len(rows)
+
+    def _write(self, rows: list[tuple]) -> None:
+        latest: dict[tuple[str, str, int], tuple] = {}
+        for row in sorted(rows, key=lambda r: r[0]):
+            latest[(row[1], row[2], row[3])] = row
+        with self._db:
+            self._db.executemany(
+                f"INSERT INTO task_events ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.executemany(
+                "INSERT INTO task_state (updated_at, session_id, answer_id, task_id, description,"
+                " task_type, sop, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (session_id, answer_id, task_id) DO UPDATE SET"
+                "  description = excluded.description, task_type = excluded.task_type,"
+                "  sop = excluded.sop, status = excluded.status, updated_at = excluded.updated_at"
+                " WHERE excluded.updated_at >= task_state.updated_at",
+                list(latest.values()),
+            )
+
+    async def _flusher(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except sqlite3.Error as e:      # keep the loop alive; rows stay buffered
+                print(f"[TaskEventStore] Flush error: {e!r}")
+
+    def import_csv(self, path: str) -> int:
+        """One-off import of the UI's old interactions.csv log."""
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = []
+            for r in csv.DictReader(f):
+                try:
+                    ts = datetime.fromisoformat(r["timestamp"]).timestamp()
+                    rows.append(validate({**r, "ts": ts}))
+                except (KeyError, ValueError):
+                    continue
+        if rows:
+            self._write(rows)
+        return len(rows)
+
+    def is_empty(self) -> bool:
+        return self._read.execute("SELECT 1 FROM task_events LIMIT 1").fetchone() is None
+
+    # ── reads ────────────────────────────────────────────────────────────
+    def stats(
+        self,
+        session_id: str | None = None,
+        sop: str | None = None,
+        task_type: str | None = None,
+        since: float | None = None,
+    ) -> dict:
+        """Completion counts over the latest state of every task, grouped by
+        session, task type and SOP, plus the overall total. Blocking – call
+        it through asyncio.to_thread."""
+        where, args = [], []
+        for col, val in (("session_id", session_id), ("sop", sop), ("task_type", task_type)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                args.append(val)
+        if since is not None:
+            where.append("updated_at >= ?")
+            args.append(since)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+
+        def grouped(col: str | None) -> list[dict]:
+            key = f"{col}, " if col else ""
+            rows = self._read.execute(
+                f"SELECT {key}COUNT(*), SUM(status = 'completed'), MAX(updated_at)"
+                f" FROM task_state{clause}" + (f" GROUP BY {col} ORDER BY {col}" if col else ""),
+                args,
+            ).fetchall()
+            out = []
+            for row in rows:
+                total, done, last = row[-3], row[-2] or 0, row[-1]
+                if not total:
+                    continue
+                item = {"total": total, "completed": done,
+                        "completion_rate": round(done / total, 4), "last_update": last}
+                out.append({col: row[0], **item} if col else item)
+            return out
+
+        with self._read_lock:
+            overall = grouped(None)
+            return {
+                "total": overall[0] if overall else {"total": 0, "completed": 0,
+                                                     "completion_rate": 0.0, "last_update": None},
+                "by_type": grouped("task_type"),
+                "by_sop": grouped("sop"),
+                "by_session": grouped("session_id"),
+            }
@@ -0,0 +1,365 @@
+# telemetry.py  – tracing spans, Prometheus metrics and sampled profiles
+#
+# Every request gets a trace (id from X-Request-ID or a fresh one) that
+# collects timed spans for the backend stages it passes through, plus the
+# per-component timings Langflow reports in its run results. Span and
+# request durations feed the histograms served at /metrics in Prometheus
+# text format. With PROFILING on, a request sent with `X-Profile: 1` is
+# also stack-sampled while it runs.
+
+import contextvars
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+# ── metrics ────────────────────────────────────────────────────────────
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = ()):
+        self.name, self.doc, self.labelnames = name, doc, labels
+        self._lock = threading.Lock()
+        REGISTRY[name] = self
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class CounterMetric(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {v:g}"
+                                for k, v in sorted(self._values.items())]
+
+
+class HistogramMetric(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}      # labels → [bucket counts, sum, count]
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            counts, _, _ = state = self._values.setdefault(
+                labels, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, (counts, total, n) in sorted(self._values.items()):
+            for bound, c in zip(self.buckets, counts):
+                le = _labels(self.labelnames + ("le",), key + (f"{bound:g}",))
+                lines.append(f"{self.name}_bucket{le} {c}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + ('+Inf',))} {n}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+REGISTRY: dict[str, _Metric] = {}
+
+HTTP_REQUESTS = CounterMetric("ot_http_requests_total", "HTTP requests handled.",
+                              ("method", "route", "status"))
+HTTP_LATENCY = HistogramMetric("ot_http_request_seconds", "Request latency until the last body byte.",
+                               ("method", "route"))
+HTTP_REQUEST_BYTES = HistogramMetric("ot_http_request_bytes", "Request body size.",
+                                     ("route",), SIZE_BUCKETS)
+HTTP_RESPONSE_BYTES = HistogramMetric("ot_http_response_bytes", "Response body size.",
+                                      ("route",), SIZE_BUCKETS)
+STAGE_LATENCY = HistogramMetric("ot_stage_seconds", "Duration of backend stages (tracing spans).",
+                                ("stage",))
+COMPONENT_LATENCY = HistogramMetric("ot_langflow_component_seconds",
+                                    "Per-component build time reported by Langflow run results.",
+                                    ("component",))
+TTFT = HistogramMetric("ot_stream_first_token_seconds", "Time to the first streamed answer token.")
+INGEST_JOBS = CounterMetric("ot_ingest_jobs_total", "Finished ingestion jobs.", ("status",))
+INGEST_ITEMS = CounterMetric("ot_ingest_items_total", "Pages parsed and chunks stored by ingestion.",
+                             ("kind",))
+INGEST_LATENCY = HistogramMetric("ot_ingest_job_seconds", "Ingestion job run time.")
+UPLOAD_BYTES = CounterMetric("ot_upload_bytes_total", "Bytes written by /api/upload.")
+
+
+def render_metrics(extra: dict[str, tuple[str, str, float]] | None = None) -> str:
+    """Prometheus text exposition of every registered metric; `extra` adds
+    gauges/counters read at scrape time ({name: (type, help, value)})."""
+    lines: list[str] = []
+    for metric in REGISTRY.values():
+        lines += metric.render()
+    for name, (kind, doc, value) in (extra or {}).items():
+        lines += [f"# HELP {name} {doc}", f"# TYPE {name} {kind}", f"{name} {value:g}"]
+    return "\n".join(lines) + "\n"
+
+
+# ── tracing ────────────────────────────────────────────────────────────
+class Trace:
+    """Spans of one request, kept for /api/traces/{request_id}."""
+
+    def __init__(self, request_id: str, name: str):
+        self.request_id, self.name = request_id, name
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration: float | None = None
+        self.spans: list[dict] = []
+        self.profile: "Sampler | None" = None
+
+    def offset(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def to_dict(self) -> dict:
+        out = {
+            "request_id": self.request_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "spans": self.spans,
+        }
+        if self.profile is not None:
+            out["profile"] = {"samples": self.profile.samples, "idle": self.profile.idle,
+                              "top": self.profile.top(15)}
+        return out
+
+
+_trace: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("trace", default=None)
+_parent: contextvars.ContextVar[int | None] = contextvars.ContextVar("span_parent", default=None)
+_recent: OrderedDict[str, Trace] = OrderedDict()
+
+
+def current() -> Trace | None:
+    return _trace.get()
+
+
+def start_trace(name: str, request_id: str | None = None) -> tuple[Trace, contextvars.Token]:
+    trace = Trace(request_id or uuid.uuid4().hex, name)
+    return trace, _trace.set(trace)
+
+
+def finish_trace(trace: Trace, token: contextvars.Token | None = None, error: str | None = None) -> None:
+    trace.duration = trace.offset()
+    if trace.profile is not None:
+        trace.profile.stop()
+    if token is not None:
+        _trace.reset(token)
+    _recent[trace.request_id] = trace
+    while len(_recent) > config.TRACE_HISTORY:
+        _recent.popitem(last=False)
+    error = error or next((sp["attrs"]["error"] for sp in trace.spans
+                           if "error" in sp.get("attrs", {})), None)
+    slow = config.TRACE_LOG_SLOW_S
+    if error or (slow >= 0 and trace.duration >= slow):
+        print(json.dumps({"trace": trace.to_dict() | {"error": error}}, default=str))
+
+
+def get_trace(request_id: str) -> Trace | None:
+    return _recent.get(request_id)
+
+
+def _add_span(trace: Trace, name: str, start: float, duration: float,
+              parent: int | None, attrs: dict[str, Any]) -> int:
+    span_id = len(trace.spans)
+    trace.spans.append({
+        "id": span_id,
+        "parent": parent,
+        "name": name,
+        "start_ms": round(start * 1000, 2),
+        "duration_ms": round(duration * 1000, 2),
+        **({"attrs": attrs} if attrs else {}),
+    })
+    return span_id
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[dict]:
+    """Time a stage; yields the span's attribute dict so callers can add to
+    it (sizes, counts, errors). Works with or without an active trace."""
+    trace = _trace.get()
+    parent = _parent.get()
+    start = trace.offset() if trace else 0.0
+    t0 = time.perf_counter()
+    placeholder = None
+    if trace is not None:
+        # reserve the id now so children started inside can point at it
+        placeholder = _add_span(trace, name, start, 0.0, parent, attrs)
+        token = _parent.set(placeholder)
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration = time.perf_counter() - t0
+        STAGE_LATENCY.observe(duration, name)
+        if trace is not None:
+            try:
+                _parent.reset(token)
+            except ValueError:          # async generator closed from another context
+                pass
+            trace.spans[placeholder].update(duration_ms=round(duration * 1000, 2))
+            if attrs:
+                trace.spans[placeholder]["attrs"] = attrs
+
+
+def component_timings(result: Any) -> list[tuple[str, float]]:
+    """(component, seconds) for every component result in a Langflow run
+    result or stream event that carries a `timedelta`."""
+    found: list[tuple[str, float]] = []
+
+    def walk(node: Any) -> None:
+        if isinstance(node, dict):
+            td = node.get("timedelta")
+            name = node.get("component_id") or node.get("id") or node.get("component_display_name")
+            if isinstance(td, (int, float)) and not isinstance(td, bool) and name:
+                found.append((str(name), float(td)))
+            for v in node.values():
+                if isinstance(v, (dict, list)):
+                    walk(v)
+        elif isinstance(node, list):
+            for v in node:
+                walk(v)
+
+    walk(result)
+    return found
+
+
+def record_components(result: Any) -> None:
+    """Add Langflow's per-component timings under the current span."""
+    trace, parent = _trace.get(), _parent.get()
+    for component, seconds in component_timings(result):
+        COMPONENT_LATENCY.observe(seconds, component)
+        if trace is not None:
+            _add_span(trace, f"langflow.{component}", trace.offset() - seconds, seconds,
+                      parent, {"source": "langflow"})
+
+
+# ── profiling ──────────────────────────────────────────────────────────
+class Sampler:
+    """Samples one thread's Python stack every `interval` seconds on a
+    daemon thread; `collapsed()` is flamegraph.pl / speedscope input."""
+
+    def __init__(self, thread_id: int, interval: float = config.PROFILE_INTERVAL_S):
+        self.thread_id, self.interval = thread_id, interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = self.idle = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None and frame.f_code.co_name == "select" \
+                    and frame.f_code.co_filename.endswith("selectors.py"):
+                self.idle += 1            # event loop waiting on sockets
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{s} {n}\n" for s, n in self.stacks.most_common())
+
+    def top(self, n: int) -> list[dict]:
+        """Leaf frames with the most samples (where the thread was running)."""
+        leaves: Counter[str] = Counter()
+        for s, c in self.stacks.items():
+            leaves[s.rsplit(";", 1)[-1]] += c
+        return [{"frame": f, "samples": c} for f, c in leaves.most_common(n)]
+
+
+# ── ASGI middleware ────────────────────────────────────────────────────
+class TelemetryMiddleware:
+    """Trace every HTTP request: X-Request-ID in and out, request/response
+    sizes, latency to the last body byte (so SSE streams count fully)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        trace, token = start_trace(f"{scope['method']} {scope['path']}", (headers.get("x-request-id") or "")[:64] or None)
+        if config.PROFILING and headers.get("x-profile") == "1":
+            trace.profile = Sampler(threading.get_ident()).start()
+        req_bytes, resp_bytes, status = 0, 0, 500
+
+        async def receive_counted():
+            nonlocal req_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                req_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_traced(message):
+            nonlocal resp_bytes, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-request-id", trace.request_id.encode())]}
+            elif message["type"] == "http.response.body":
+                resp_bytes += len(message.get("body", b""))
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive_counted, send_traced)
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            route = scope.get("route")
+            label = getattr(route, "path", None) or "unmatched"
+            finish_trace(trace, token, error)
+            HTTP_REQUESTS.inc(scope["method"], label, str(status))
+            HTTP_LATENCY.observe(trace.duration, scope["method"], label)
+            HTTP_REQUEST_BYTES.observe(req_bytes, label)
+            HTTP_RESPONSE_BYTES.observe(resp_bytes, label)
@@ -1,11 +1,12 @@
 # app.py  – OT Service Support Assistant
 # Streamlit UI to chat with SOP bot, track tasks, images, & logging
 
-import os, uuid, json, csv, io, re, base64, binascii
+import os, uuid, json, re, base64, binascii, time
 from datetime import datetime
 
 import streamlit as st
 import requests
+from urllib.parse import quote
 
 # ───────────────────────── helpers ──────────────────────────
 def _decode_b64(data: str) -> bytes | None:
@@ -20,36 +21,115 @@ def _decode_b64(data: str) -> bytes | None:
 
 def extract_img_src(text: str) -> list[str]:
     """
-    Pull base64 payloads from <img src="data:image/png;base64, …"> tags.
-    Handles single block or chunked format like [4,'...'].
+    Pull image sources from <img> tags: image-store paths (/api/images/<id>)
+    or, for chunks ingested before the store, base64 payloads from
+    <img src="data:image/png;base64, …"> (single block or chunked like [4,'...']).
     """
     out = []
-    for val in re.findall(r'<img[^>]+src="data:image/png;base64,([^"]+)"', text):
-        m = re.match(r"\[\s*\d+\s*,\s*'([A-Za-z0-9+/=]+)'\s*\]", val)
-        out.append(m.group(1) if m else val)
+    for val in re.findall(r'<img[^>]+src="([^"]+)"', text):
+        if val.startswith("data:image/png;base64,"):
+            val = val.split(",", 1)[1]
+            m = re.match(r"\[\s*\d+\s*,\s*'([A-Za-z0-9+/=]+)'\s*\]", val)
+            val = m.group(1) if m else val
+        out.append(val)
     return out
 
+
+def _image(src: str) -> str | bytes | None:
+    """What st.image needs: a URL the browser fetches (and caches) for
+    stored images, decoded bytes for legacy base64 ones."""
+    if src.startswith("/api/images/"):
+        return IMAGE_BASE_URL + src
+    if src.startswith(("http://", "https://")):
+        return src
+    if src.startswith("data:"):
+        src = src.split(",", 1)[1]
+    return _decode_b64(src)
+
+def iter_sse(res: requests.Response):
+    """Yield (event, data) pairs from a text/event-stream response."""
+    event, data = "message", []
+    for line in res.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data:
+                try:
+                    yield event, json.loads("\n".join(data))
+                except ValueError:
+                    pass
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+
 def _back_to_chat():
     st.session_state["mode_select"] = "Chat"
 
 
 
-# thumbnail + expander
-FIXED_IMG_WIDTH = 300
-def display_answer_with_images(html: str):
-    imgs = extract_img_src(html)
+PREVIEW_CHARS = 120     # sidebar history line per message
+
+def strip_json_block(answer: str) -> str:
+    # Remove any ```json ... ``` block from the answer
+    return re.sub(r"```json.*?```", "", answer, flags=re.DOTALL).strip()
+
+
+def parse_answer(answer: str, images: list[str] | None = None,
+                 sources: list[dict] | None = None) -> dict:
+    """Everything rendering an assistant message needs, computed once and
+    kept on the history entry: clean HTML, image handles, sources, sidebar
+    preview. `images` come from the /api/query payload; without them the
+    <img> tags in the answer are used."""
+    html = strip_json_block(answer)
+    if images is None:
+        images = extract_img_src(html)
     cleaned = re.sub(r'<img[^>]*>', '', html, flags=re.IGNORECASE)
-    st.markdown(cleaned, unsafe_allow_html=True)
+    text = re.sub(r"<[^>]+>", " ", cleaned)
+    return {
+        "html": cleaned,
+        "images": [_image(src) for src in images],
+        "sources": sources or [],
+        "preview": re.sub(r"\s+", " ", text).strip()[:PREVIEW_CHARS],
+    }
+
+
+def message_view(m: dict) -> dict:
+    if "view" not in m:
+        m["view"] = (parse_answer(m["content"], m.get("images"), m.get("sources"))
+                     if m["role"] == "assistant" else
+                     {"html": m["content"], "images": [],
+                      "preview": m["content"][:PREVIEW_CHARS]})
+    return m["view"]
 
-    for i, b64 in enumerate(imgs, start=1):
-        img = _decode_b64(b64)
+
+# thumbnail; the full-size copy is only sent when asked for
+FIXED_IMG_WIDTH = 300
+def display_answer_with_images(view: dict, key: str):
+    st.markdown(view["html"], unsafe_allow_html=True)
+    if view.get("sources"):
+        st.caption("📄 Sources: " + " · ".join(
+            f"{s['filename']} p. {s['page']}" if s.get("page") else s["filename"]
+            for s in view["sources"]
+        ))
+
+    for i, img in enumerate(view["images"], start=1):
         if not img:
             st.warning(f"Image {i} could not be decoded.")
             continue
         st.image(img, caption=f"Related image {i}", width=FIXED_IMG_WIDTH)
-        with st.expander("🔍 Click to view full size", expanded=False):
+        if st.toggle("🔍 View full size", key=f"full_{key}_{i}"):
             st.image(img, use_container_width=True)
 
+
+def render_message(m: dict, key: str):
+    with st.chat_message(m["role"]):
+        if m["role"] == "assistant":
+            display_answer_with_images(message_view(m), key)
+        else:
+            st.markdown(m["content"], unsafe_allow_html=True)
+
 # ─────────────────────── page config ────────────────────────
 st.set_page_config("OT Service Support Assistant", "🤖", layout="wide")
 css_path = os.path.join(os.path.dirname(__file__), "static", "style.css")
@@ -71,29 +151,125 @@ st.markdown(
 # ───────────────────── env & session state ──────────────────
 UPLOAD_URL = os.getenv("UPLOAD_URL", "http://localhost:8000/api/upload")
 QUERY_URL  = os.getenv("QUERY_URL",  "http://localhost:8000/api/query")
+QUERY_STREAM_URL = os.getenv("QUERY_STREAM_URL", "http://localhost:8000/api/query/stream")
+JOBS_URL   = os.getenv("JOBS_URL",   "http://localhost:8000/api/jobs")
+TASKS_URL  = os.getenv("TASKS_URL",  "http://localhost:8000/api/tasks")
+SUGGEST_URL = os.getenv("SUGGEST_URL", "http://localhost:8000/api/suggestions")
+# chat histories and file lists are kept by the backend, not in this process
+SESSIONS_URL = os.getenv("SESSIONS_URL", "http://localhost:8000/api/sessions")
+FILES_URL  = os.getenv("FILES_URL",  "http://localhost:8000/api/files")
+# messages rendered per page of chat history; older pages load on demand
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "10"))
+# backend address as seen from the *browser* – it loads /api/images/<id> and
+# file downloads (/api/files/<session>/<name>) directly
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "http://localhost:8000").rstrip("/")
 
 if "all_sessions"        not in st.session_state: st.session_state.all_sessions        = []
-if "histories"           not in st.session_state: st.session_state.histories           = {}
-if "processed_files_map" not in st.session_state: st.session_state.processed_files_map = {}
 if "prepopulate_prompt" not in st.session_state:
     st.session_state["prepopulate_prompt"] = ""
 if "last_suggestions" not in st.session_state:
     st.session_state["last_suggestions"] = []
 if "pending_suggestion" not in st.session_state:
     st.session_state["pending_suggestion"] = ""
+if "job_status"  not in st.session_state: st.session_state.job_status  = {}   # job_id → last status
+if "history_pages" not in st.session_state: st.session_state.history_pages = {} # sid → pages shown
+# the current session's latest messages and files, as last fetched from the backend
+if "loaded" not in st.session_state: st.session_state.loaded = {}
 
 
+def new_session_id() -> str:
+    return datetime.now().strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
 
 if not st.session_state.all_sessions:
-    sid = datetime.now().strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
+    # ?session=<id> reopens a session after a reload or on another replica
+    sid = st.query_params.get("session") or new_session_id()
     st.session_state.all_sessions.append(sid)
-    st.session_state.histories[sid]           = []
-    st.session_state.processed_files_map[sid] = {}
     st.session_state.session_id = sid
 
-SESSION_ID    = st.session_state.session_id
-chat_history  = st.session_state.histories.setdefault(SESSION_ID, [])
-session_files = st.session_state.processed_files_map.setdefault(SESSION_ID, {})
+SESSION_ID = st.session_state.session_id
+st.query_params["session"] = SESSION_ID
+
+
+def load_session(sid: str, limit: int) -> dict:
+    """Latest `limit` messages and the file list of a session, fetched once
+    per session / page count and then kept until something changes."""
+    loaded = st.session_state.loaded
+    if loaded.get("sid") != sid or loaded.get("limit", 0) < limit:
+        try:
+            hist = requests.get(f"{SESSIONS_URL}/{sid}/history",
+                                params={"limit": limit}, timeout=5).json()
+            files = requests.get(f"{FILES_URL}/{sid}", timeout=5).json()["files"]
+            loaded = {"sid": sid, "limit": limit, "total": hist["total"],
+                      "messages": hist["messages"], "files": files}
+        except (requests.RequestException, ValueError, KeyError):
+            st.warning("⚠️ Backend unreachable – session history unavailable")
+            return {"sid": sid, "limit": 0, "total": 0, "messages": [], "files": []}
+        st.session_state.loaded = loaded
+    return loaded
+
+
+def refresh_files() -> None:
+    st.session_state.loaded.pop("sid", None)
+
+
+def save_turn(messages: list[dict]) -> None:
+    """Append a chat turn to the backend's history and the local copy."""
+    try:
+        requests.post(f"{SESSIONS_URL}/{SESSION_ID}/history", timeout=5, json={
+            "messages": [{k: v for k, v in m.items() if k != "view"} for m in messages]})
+    except requests.RequestException:
+        st.caption("⚠️ Chat turn not saved: backend unreachable")
+    session["messages"].extend(messages)
+    session["total"] += len(messages)
+    session["limit"] += len(messages)
+
+
+session = load_session(SESSION_ID, st.session_state.history_pages.get(SESSION_ID, 1) * HISTORY_WINDOW)
+chat_history  = session["messages"]
+session_files = {f["name"]: f for f in session["files"]}
+session_jobs  = {f["name"]: f["job_id"] for f in session["files"] if f.get("job_id")}
+
+@st.fragment(run_every=2)
+def ingest_status(jobs: dict[str, str]):
+    """Poll ingestion jobs without rerunning (or blocking) the chat."""
+    cache = st.session_state.job_status
+    for fname, job_id in jobs.items():
+        job = cache.get(job_id)
+        if not job or job["status"] not in ("done", "failed"):
+            try:
+                job = requests.get(f"{JOBS_URL}/{job_id}", timeout=5).json()
+                cache[job_id] = job
+            except (requests.RequestException, ValueError):
+                st.caption(f"⏳ {fname}: status unavailable")
+                continue
+        status = job.get("status", "?")
+        if status == "done":
+            st.caption(f"✅ {fname}: indexed {job['chunks_stored']} chunks "
+                       f"from {job['pages_parsed']} pages")
+        elif status == "failed":
+            st.caption(f"❌ {fname}: {job.get('error')}")
+        else:
+            st.caption(f"⏳ {fname}: {status} – {job.get('pages_parsed', 0)} pages, "
+                       f"{job.get('chunks_split', 0)} chunks")
+
+def fetch_suggestions(query: str, answer: str) -> list[str]:
+    """Follow-up questions from the session's question bank – asked for once
+    the answer is on screen, so it never waits on them."""
+    asked = [m["content"] for m in chat_history if m["role"] == "user"]
+    try:
+        return requests.post(SUGGEST_URL, timeout=5, json={
+            "session_id": SESSION_ID, "query": query, "answer": answer, "asked": asked,
+        }).json().get("suggestions", [])
+    except (requests.RequestException, ValueError):
+        return []
+
+@st.cache_data(ttl=30, show_spinner=False)
+def task_stats() -> dict | None:
+    """Completion stats across all sessions, from the backend's event store."""
+    try:
+        return requests.get(f"{TASKS_URL}/stats", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return None
 
 # ───────────────────────── sidebar ──────────────────────────
 with st.sidebar:
@@ -114,10 +290,8 @@ with st.sidebar:
             st.rerun()
 
         if st.button("🔄 New session"):
-            new_sid = datetime.now().strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
+            new_sid = new_session_id()
             st.session_state.all_sessions.append(new_sid)
-            st.session_state.histories[new_sid] = []
-            st.session_state.processed_files_map[new_sid] = {}
             st.session_state.session_id = new_sid
             # Clear suggestions for the new session
             st.session_state["last_suggestions"] = []
@@ -128,12 +302,10 @@ with st.sidebar:
         st.markdown("Upload your SOPs or logs for analysis.")
         if session_files:
             st.markdown("**Uploaded files:**")
-            for fname in session_files:
-                st.markdown(f"- {fname}")
-                st.download_button("Download",
-                                   data=session_files[fname],
-                                   file_name=fname,
-                                   key=f"dl_{SESSION_ID}_{fname}")
+            for fname, f in session_files.items():
+                # the browser downloads straight from the backend
+                st.markdown(f"- [{fname}]({IMAGE_BASE_URL}/api/files/{SESSION_ID}/"
+                            f"{quote(f['stored_name'])})")
 
         uploads = st.file_uploader("Select files",
                                    type=["pdf", "docx", "txt"],
@@ -141,91 +313,53 @@ with st.sidebar:
                                    key=f"uploader_{SESSION_ID}")
         for up in uploads or []:
             if up.name not in session_files:
-                bio = io.BytesIO(up.getvalue()); bio.name = up.name
                 with st.spinner(f"Uploading {up.name}…"):
                     res = requests.post(UPLOAD_URL,
-                                        files={"file": (up.name, bio, up.type)},
+                                        files={"file": (up.name, up, up.type)},
                                         data={"session_id": SESSION_ID})
                 if res.ok:
                     st.success(f"Uploaded {up.name}")
-                    session_files[up.name] = up.getvalue()
+                    session_files[up.name] = {"stored_name": res.json()["filename"]}
+                    session_jobs[up.name] = res.json()["job_id"]
+                    refresh_files()
                 else:
                     st.error(f"Failed to upload {up.name}")
 
+        if session_jobs:
+            st.markdown("**Indexing:**")
+            ingest_status(session_jobs)
+
     st.markdown("---")
     # key lets us switch programmatically
     mode = st.radio("Mode", ("Chat", "Task"), key="mode_select")
     st.markdown(f"**🆔 Session ID:** `{SESSION_ID}`")
 
     with st.expander("Session History", False):
-        for m in chat_history:
-            st.markdown(f"**{m['role'].capitalize()}:** {m['content']}")
+        # one text preview per message, a single element however long the session
+        st.markdown("\n\n".join(
+            f"**{m['role'].capitalize()}:** {message_view(m)['preview']}"
+            for m in chat_history
+        ) or "_No messages yet._")
 
 # ───────────────────── helper for html check ─────────────────
 def is_html(text: str) -> bool:
     t = text.strip().lower()
     return t.startswith("<!doctype html") or t.startswith("<html")
 
-def strip_json_block(answer: str) -> str:
-    # Remove any ```json ... ``` block from the answer
-    return re.sub(r"```json.*?```", "", answer, flags=re.DOTALL).strip()
-
-def get_suggestions_from_resp(resp):
-    print("DEBUG: Checking resp:", type(resp), "keys:", list(resp.keys()))
-    suggestions = []
-    try:
-        outputs = resp.get("outputs", [])
-        print("DEBUG: Outputs length:", len(outputs))
-        # 1. Normal second output block (as before)
-        if len(outputs) > 1:
-            sugg_output = outputs[1]
-            msg = sugg_output["outputs"][0]["results"]["message"]
-            if "data" in msg and "text" in msg["data"]:
-                sugg_text = msg["data"]["text"]
-            else:
-                sugg_text = msg.get("text", "")
-            clean = re.sub(r'^```json\s*|\s*```$', '', sugg_text, flags=re.DOTALL).strip()
-            print("DEBUG: Suggestions text block:\n", clean)
-            try:
-                parsed = json.loads(clean)
-                suggestions = parsed.get("suggestions", [])
-                print("DEBUG: Suggestions list:", suggestions)
-            except Exception as e:
-                print("DEBUG: JSON decode failed:", e)
-        # 2. Fallback: look for ```json ... ``` inside outputs[0]
-        elif len(outputs) == 1:
-            main_output = outputs[0]
-            msg = main_output["outputs"][0]["results"]["message"]
-            text = msg.get("data", {}).get("text", "") or msg.get("text", "")
-            # Find code block: ```json ... ```
-            json_match = re.search(r'```json(.*?)```', text, re.DOTALL)
-            if json_match:
-                clean = json_match.group(1).strip()
-                print("DEBUG: Fallback suggestions block:\n", clean)
-                try:
-                    parsed = json.loads(clean)
-                    suggestions = parsed.get("suggestions", [])
-                    print("DEBUG: Suggestions (fallback):", suggestions)
-                except Exception as e:
-                    print("DEBUG: Fallback JSON parse failed:", e)
-            else:
-                print("DEBUG: No suggestion JSON block found in main output!")
-        else:
-            print("DEBUG: No outputs in response!")
-    except Exception as e:
-        print("DEBUG: Exception in suggestion parse:", e)
-    print("DEBUG: Final suggestions list:", suggestions)
-    return suggestions
-
 # --- Chat Mode ---
 if mode == "Chat":
-    # 1. Display chat history
-    for m in chat_history:
-        with st.chat_message(m["role"]):
-            if m["role"] == "assistant":
-                display_answer_with_images(strip_json_block(m["content"]))
-            else:
-                st.markdown(m["content"], unsafe_allow_html=True)
+    # 1. Display chat history: the latest page, older pages on request
+    #    (the backend keeps the history; only the pages shown are fetched)
+    pages = st.session_state.history_pages.get(SESSION_ID, 1)
+    start = max(0, len(chat_history) - pages * HISTORY_WINDOW)
+    hidden = session["total"] - len(chat_history) + start
+    if hidden:
+        if st.button(f"⬆️ Show earlier messages ({hidden} hidden)", key=f"older_{SESSION_ID}"):
+            st.session_state.history_pages[SESSION_ID] = pages + 1
+            st.rerun()
+    offset = session["total"] - len(chat_history)
+    for idx in range(start, len(chat_history)):
+        render_message(chat_history[idx], f"{SESSION_ID}_{offset + idx}")
 
     # 2. Suggestion buttons and banner
     suggestions = st.session_state.get("last_suggestions", [])
@@ -245,45 +379,59 @@ if mode == "Chat":
         # Process user input as usual
         st.chat_message("user").write(prompt)
         with st.chat_message("assistant"):
-            with st.spinner("Thinking…"):
-                res = requests.post(
-                    QUERY_URL,
-                    json={"query": prompt, "session_id": SESSION_ID},
-                    timeout=90
-                )
+            # stream tokens into a placeholder, then render the final answer
+            placeholder = st.empty()
+            placeholder.markdown("_Thinking…_")
+            streamed, resp = "", None
+            with requests.post(
+                QUERY_STREAM_URL,
+                json={"query": prompt, "session_id": SESSION_ID},
+                stream=True,
+                timeout=(5, 90),
+            ) as res:
+                if res.status_code == 429:
+                    placeholder.empty()
+                    st.warning("⏳ The assistant is busy right now – please ask again in a "
+                               f"few seconds ({res.json().get('error', 'server busy')}).")
+                    st.stop()
                 res.raise_for_status()
-                outer = res.json()
-                resp = outer.get("response")
-                if isinstance(resp, str) and resp.strip().startswith("{"):
-                    resp = json.loads(resp)
-                answer = ""
-                try:
-                    answer = (
-                        resp["outputs"][0]["outputs"][0]["results"]["message"]["text"]
-                        if isinstance(resp, dict) else str(resp)
-                    )
-                except Exception:
-                    answer = str(resp)
-                answer_main = strip_json_block(answer)
-                display_answer_with_images(answer_main)
-
-                # Suggestions extraction
-                new_suggestions = get_suggestions_from_resp(resp)
-                st.session_state["last_suggestions"] = new_suggestions
-                if new_suggestions:
-                    st.markdown("#### 💡 You might also ask:")
-                    cols = st.columns(min(len(new_suggestions), 3))
-                    for i, q in enumerate(new_suggestions):
-                        if cols[i % 3].button(q, key=f"sugg_{i}"):
-                            st.session_state["pending_suggestion"] = q
-                            st.rerun()
-                else:
-                    st.session_state["last_suggestions"] = []
-                    st.info("No suggestions found.")
+                for event, data in iter_sse(res):
+                    if event == "token":
+                        streamed += data.get("chunk", "")
+                        # hide a trailing ```json suggestions block while it streams
+                        placeholder.markdown(streamed.split("```json")[0] + "▌")
+                    elif event == "end":
+                        resp = data
+                    elif event == "error":
+                        st.error(f"Backend error: {data.get('error')}")
+            placeholder.empty()
+
+            # the end event carries the backend's compact answer payload
+            if resp is None:
+                resp = {"answer": streamed}
+            answer_main = strip_json_block(resp.get("answer", ""))
+            view = parse_answer(answer_main, resp.get("images"), resp.get("sources"))
+            display_answer_with_images(view, f"{SESSION_ID}_{session['total'] + 1}")
+
+            # flows that still generate suggestions send them with the answer
+            new_suggestions = resp.get("suggestions") or fetch_suggestions(prompt, answer_main)
+            st.session_state["last_suggestions"] = new_suggestions
+            if new_suggestions:
+                st.markdown("#### 💡 You might also ask:")
+                cols = st.columns(min(len(new_suggestions), 3))
+                for i, q in enumerate(new_suggestions):
+                    if cols[i % 3].button(q, key=f"sugg_{i}"):
+                        st.session_state["pending_suggestion"] = q
+                        st.rerun()
+            else:
+                st.session_state["last_suggestions"] = []
+                st.info("No suggestions found.")
 
         # Update chat history after successful run
-        chat_history.append({"role": "user", "content": prompt})
-        chat_history.append({"role": "assistant", "content": answer_main})
+        save_turn([{"role": "user", "content": prompt},
+                   {"role": "assistant", "id": uuid.uuid4().hex[:12],
+                    "content": answer_main, "view": view,
+                    "images": resp.get("images"), "sources": resp.get("sources") or []}])
 
     else:
         # Only show suggestions if there is no active prompt being sent
@@ -303,9 +451,13 @@ else:
         st.info("Run a chat first so we have something to convert into tasks.")
         st.stop()
 
-    raw_html  = chat_history[-1]["content"]
-    img_srcs  = extract_img_src(raw_html)
-    chat_text = re.sub(r'<img[^>]*>', '', raw_html, flags=re.IGNORECASE)
+    last      = chat_history[-1]
+    view      = message_view(last)
+    chat_text = view["html"]
+    # items are numbered per answer, so the answer's id keeps them apart
+    answer_id = last.get("id") or str(session["total"] - 1)
+    # the SOP the answer was mainly drawn from (its first retrieved source)
+    sop = view["sources"][0]["filename"] if view.get("sources") else ""
 
     num_pat = re.compile(r"^\s*(\d+)[\.\)\-]\s+(.+)$")
     bul_pat = re.compile(r"^\s*([\-\*\u2022]|•)\s+(.+)$")
@@ -332,7 +484,7 @@ else:
 
         for t in tasks:
             # checkbox
-            ck_key = f"{SESSION_ID}_task_{t['id']}"
+            ck_key = f"{SESSION_ID}_{answer_id}_task_{t['id']}"
             checked = st.checkbox(t["description"],
                                   value=st.session_state.get(ck_key, False),
                                   key=ck_key)
@@ -342,7 +494,7 @@ else:
                 st.markdown(f"&nbsp;&nbsp;&nbsp;• {sub}")
 
             # task type selector (same row)
-            type_key = f"{SESSION_ID}_type_{t['id']}"
+            type_key = f"{SESSION_ID}_{answer_id}_type_{t['id']}"
             default_type = st.session_state.get(type_key, "General")
             task_type = st.selectbox(
                 "Type",
@@ -358,26 +510,25 @@ else:
                 st.session_state[ck_key] = checked
                 st.session_state[type_key] = task_type
 
-                log_exists = os.path.exists("interactions.csv")
-                with open("interactions.csv", "a", newline="", encoding="utf-8") as f:
-                    w = csv.writer(f)
-                    if not log_exists:
-                        w.writerow(["timestamp", "session_id", "task_id",
-                                    "description", "task_type", "status"])
-                    w.writerow([
-                        datetime.now().isoformat(timespec="seconds"),
-                        SESSION_ID,
-                        t["id"],
-                        t["description"],
-                        task_type,
-                        "completed" if checked else "incomplete",
-                    ])
+                try:
+                    requests.post(f"{TASKS_URL}/events", timeout=5, json={
+                        "ts": time.time(),
+                        "session_id": SESSION_ID,
+                        "answer_id": answer_id,
+                        "task_id": t["id"],
+                        "description": t["description"],
+                        "task_type": task_type,
+                        "sop": sop,
+                        "status": "completed" if checked else "incomplete",
+                    })
+                except requests.RequestException:
+                    st.caption("⚠️ Task event not logged: backend unreachable")
 
         # simple progress by type
         by_type = {}
         for t in tasks:
-            typ = st.session_state.get(f"{SESSION_ID}_type_{t['id']}", "General")
-            done = st.session_state.get(f"{SESSION_ID}_task_{t['id']}", False)
+            typ = st.session_state.get(f"{SESSION_ID}_{answer_id}_type_{t['id']}", "General")
+            done = st.session_state.get(f"{SESSION_ID}_{answer_id}_task_{t['id']}", False)
             by_type.setdefault(typ, {"total": 0, "done": 0})
             by_type[typ]["total"] += 1
             by_type[typ]["done"]  += 1 if done else 0
@@ -386,12 +537,22 @@ else:
         for typ, stat in by_type.items():
             st.text(f"{typ}: {stat['done']}/{stat['total']} completed")
 
+        with st.expander("All sessions", False):
+            stats = task_stats()
+            if not stats:
+                st.caption("Stats unavailable")
+            else:
+                total = stats["total"]
+                st.text(f"{total['completed']}/{total['total']} tasks completed "
+                        f"across {len(stats['by_session'])} sessions")
+                for row in stats["by_type"]:
+                    st.text(f"{row['task_type']}: {row['completed']}/{row['total']} completed")
+
     # related images
-    if img_srcs:
+    if view["images"]:
         st.markdown("---")
         st.markdown("#### Related images")
-        for i, b64 in enumerate(img_srcs, start=1):
-            img = _decode_b64(b64)
+        for i, img in enumerate(view["images"], start=1):
             if img:
                 st.image(img, caption=f"Image {i}", width=FIXED_IMG_WIDTH)
 
@@ -0,0 +1,65 @@
+# bench_context.py  – prompt size vs. SOP length with the Context Assembler
+#
+# Splits synthetic manuals of growing length with the loader's structured
+# splitter and packs them with the Context Assembler (both loaded from the
+# flow JSON), once as the RAG flow does (retrieved top-k + question) and
+# once as the loader's suggestion agent does (whole corpus, no question).
+# The packed context should stay under the budget however long the manual;
+# the "unbounded" column is what the old whole-document path sent.
+#
+#   python benchmarks/bench_context.py --budget 2000
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import flow_code      # noqa: E402
+from make_sop_pdfs import page_text  # noqa: E402
+
+
+def corpus(splitter, files: int, pages: int, chunk_size: int) -> list:
+    rng = random.Random(0)
+    items = []
+    for doc in range(files):
+        for page in range(1, pages + 1):
+            text = page_text(rng, doc, page)
+            for section, chunk in splitter.split_structured(text, chunk_size, 100):
+                items.append((chunk, {"filename": f"20250101_080000_SOP_{doc:03d}.pdf",
+                                      "page_idx": page, "section": section}))
+    return items
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Context Assembler prompt-size benchmark")
+    ap.add_argument("--budget", type=int, default=2000, help="token budget")
+    ap.add_argument("--files", type=int, default=3)
+    ap.add_argument("--chunk-size", type=int, default=1000)
+    ap.add_argument("--top-k", type=int, default=8, help="retrieved chunks for the RAG case")
+    args = ap.parse_args()
+
+    asm = flow_code.load_helpers("RAG for OT", "ContextAssembler-Rq7Tz")
+    # the character splitter is only used by the component class
+    splitter = flow_code.load_helpers("Data_Loader for OT", "SplitText-K3W93",
+                                      skip=("langchain_text_splitters",))
+    print(f"budget {args.budget} tokens, {args.files} manuals, chunk size {args.chunk_size} chars")
+    print(f"{'pages':>6} {'chunks':>7} {'unbounded':>10} {'overview':>9} {'rag top-k':>9} {'ms':>6}")
+    for pages in (10, 50, 200, 800):
+        items = corpus(splitter, args.files, pages, args.chunk_size)
+        whole = asm.estimate_tokens("\n".join(t for t, _ in items))
+        t0 = time.perf_counter()
+        _, overview = asm.assemble(items, args.budget)
+        ms = (time.perf_counter() - t0) * 1000
+        hits = items[:: max(len(items) // args.top_k, 1)][: args.top_k]
+        question = f"How do I clear fault {hits[0][0].split('Fault code ')[1][:6]}?"
+        _, rag = asm.assemble(hits + hits[:2], args.budget, question)
+        print(f"{pages:>6} {len(items):>7} {whole:>10,} {overview['tokens']:>9,} "
+              f"{rag['tokens']:>9,} {ms:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# bench_embed.py  – cached, batched embeddings of the flows' Ollama node
+#
+# Runs the CachedOllamaEmbeddings class out of the loader flow against a
+# stub Ollama `/api/embed` that costs a fixed overhead per request plus a
+# per-text time and serves `--parallel` requests at once (OLLAMA_NUM_PARALLEL).
+# Shows cold ingest at several batch/concurrency settings, then a re-ingest
+# of a revised corpus where only `--changed` of the chunks differ.
+#
+#   python benchmarks/bench_embed.py --chunks 1000 --changed 0.1
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import flow_code      # noqa: E402
+import stub_langflow  # noqa: E402
+
+DIM = 1024
+
+
+def _vector(text: str) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+    rnd = random.Random(seed)
+    return [rnd.uniform(-1, 1) for _ in range(DIM)]
+
+
+class OllamaHandler(BaseHTTPRequestHandler):
+    overhead = 0.02      # per request
+    per_text = 0.002     # per embedded text
+    slots = threading.Semaphore(4)
+    requests = texts = 0
+    counter_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        with self.slots:
+            time.sleep(self.overhead + self.per_text * len(inputs))
+        with self.counter_lock:
+            type(self).requests += 1
+            type(self).texts += len(inputs)
+        raw = json.dumps({"model": body["model"],
+                          "embeddings": [_vector(t) for t in inputs]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def start_ollama(parallel: int):
+    handler = type("Handler", (OllamaHandler,), {"slots": threading.Semaphore(parallel)})
+    server = stub_langflow.StubServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler
+
+
+def corpus(n: int, seed: int = 0) -> list[str]:
+    rnd = random.Random(seed)
+    words = "valve pump PLC interlock torque sensor reset fault relay HMI purge".split()
+    return [f"Step {i}: " + " ".join(rnd.choices(words, k=150)) for i in range(n)]
+
+
+def run(mod, url: str, handler, texts: list[str], cache: str,
+        batch_size: int, concurrency: int) -> dict:
+    handler.requests = handler.texts = 0
+    emb = mod.CachedOllamaEmbeddings("mxbai-embed-large:latest", url, cache,
+                                     batch_size=batch_size, concurrency=concurrency)
+    t0 = time.perf_counter()
+    # the vector store hands the embedder 100 documents at a time
+    for i in range(0, len(texts), 100):
+        emb.embed_documents(texts[i : i + 100])
+    wall = time.perf_counter() - t0
+    return {"batch": batch_size, "concurrency": concurrency, "wall_s": wall,
+            "requests": handler.requests, "embedded": handler.texts,
+            "chunks_per_s": len(texts) / wall}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Embedding cache / batching benchmark")
+    ap.add_argument("--chunks", type=int, default=1000)
+    ap.add_argument("--changed", type=float, default=0.1,
+                    help="fraction of chunks that differ in the revised corpus")
+    ap.add_argument("--parallel", type=int, default=4,
+                    help="requests the stub Ollama serves at once")
+    args = ap.parse_args()
+
+    mod = flow_code.load_helpers("Data_Loader for OT", "OllamaEmbeddings-DBIyn")
+    server, handler = start_ollama(args.parallel)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    texts = corpus(args.chunks)
+    revised = list(texts)
+    for i in random.Random(1).sample(range(len(texts)), int(len(texts) * args.changed)):
+        revised[i] += " (rev. B)"
+
+    def show(label: str, r: dict) -> None:
+        print(f"  {label:<28} {r['wall_s']:6.2f}s  {r['chunks_per_s']:8.0f} chunks/s  "
+              f"{r['requests']:>5} requests  {r['embedded']:>6} texts embedded")
+
+    print(f"{args.chunks} chunks, stub Ollama with {args.parallel} parallel slots")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for batch, conc in ((1, 1), (64, 1), (64, args.parallel)):
+                cache = os.path.join(tmp, f"cold-{batch}-{conc}.sqlite3")
+                show(f"cold  batch={batch} conc={conc}",
+                     run(mod, url, handler, texts, cache, batch, conc))
+            show(f"revised ({args.changed:.0%} changed)",
+                 run(mod, url, handler, revised, cache, 64, args.parallel))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
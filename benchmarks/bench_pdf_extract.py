@@ -0,0 +1,56 @@
+# bench_pdf_extract.py  – pages/second of the loader's FolderFileReader extractor
+#
+# Generates a synthetic multi-PDF corpus and runs the extractor from the
+# Data_Loader flow (loaded straight from the flow JSON) with 1 worker and
+# with a process pool, reporting pages per second and peak RSS.
+#
+#   python benchmarks/bench_pdf_extract.py --files 8 --pages 150
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import flow_code      # noqa: E402
+import make_sop_pdfs  # noqa: E402
+
+
+def run(reader, paths: list[str], image_dir: str, workers: int) -> dict:
+    t0 = time.perf_counter()
+    pages = images = chars = 0
+    for _, rec in reader.iter_pdf_pages(paths, image_dir, workers=workers):
+        pages += 1
+        images += len(rec.get("images", []))
+        chars += len(rec.get("text", ""))
+    wall = time.perf_counter() - t0
+    return {"workers": workers, "pages": pages, "images": images,
+            "chars": chars, "wall_s": wall, "pages_per_s": pages / wall}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="FolderFileReader PDF extraction benchmark")
+    ap.add_argument("--files", type=int, default=8)
+    ap.add_argument("--pages", type=int, default=150)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    reader = flow_code.load_helpers("Data_Loader for OT", "FolderFileReader-X3ZHU")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_sop_pdfs.make_corpus(tmp, args.files, args.pages)
+        print(f"corpus: {args.files} PDFs × {args.pages} pages")
+        for workers in sorted({1, args.workers}):
+            r = run(reader, paths, os.path.join(tmp, f".images-{workers}"), workers)
+            print(f"  workers={r['workers']:<3d} {r['pages']:>6,} pages  "
+                  f"{r['wall_s']:6.2f}s  {r['pages_per_s']:8.1f} pages/s  "
+                  f"({r['images']} images)")
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"  peak RSS (parent) {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# bench_query.py  – concurrent /api/query load against a stub Langflow
+#
+# Starts the stub on a free port, boots the backend under uvicorn pointed
+# at it and fires N concurrent queries. With a pooled async client the
+# wall time should stay close to one stub latency, not N of them.
+# `--stream` hits /api/query/stream instead and reports time-to-first-token.
+# The answer cache is off unless `--cache` is given; then every round after
+# the first asks the same questions again and should be served from it.
+# Each in-flight query has its own session; queries admission control turns
+# away with a 429 are counted, not retried.
+#
+#   python benchmarks/bench_query.py --concurrency 16 --latency 0.5
+#   python benchmarks/bench_query.py --stream --latency 5
+#   python benchmarks/bench_query.py --cache --rounds 5
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", "Backend"))
+
+import stub_langflow  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_backend(port: int = 0):
+    """Run Backend/main.py under uvicorn on a background thread."""
+    import uvicorn
+
+    port = port or _free_port()
+    server = uvicorn.Server(uvicorn.Config("main:app", host="127.0.0.1", port=port,
+                                           log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def _one(client, i: int, stream: bool) -> tuple[float, float] | None:
+    """Return (time to first byte of answer, total time) for one query, or
+    None when admission control turned it away with a 429."""
+    # one session per in-flight query, so SESSION_MAX_INFLIGHT doesn't bite
+    body = {"query": f"reset PLC after E-stop #{i}", "session_id": f"bench_{i}"}
+    t0 = time.perf_counter()
+    if not stream:
+        r = await client.post("/api/query", json=body)
+        if r.status_code == 429:
+            return None
+        r.raise_for_status()
+        total = time.perf_counter() - t0
+        return total, total
+
+    first = None
+    async with client.stream("POST", "/api/query/stream", json=body) as r:
+        if r.status_code == 429:
+            return None
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if first is None and line.startswith("event: token"):
+                first = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    return (first if first is not None else total), total
+
+
+async def run(base_url: str, concurrency: int, rounds: int, stream: bool) -> dict:
+    import httpx
+
+    firsts: list[float] = []
+    totals: list[float] = []
+    rejected = 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as c:
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for res in await asyncio.gather(*(_one(c, i, stream) for i in range(concurrency))):
+                if res is None:
+                    rejected += 1
+                    continue
+                first, total = res
+                firsts.append(first)
+                totals.append(total)
+        wall = time.perf_counter() - t0
+        cache = (await c.get("/api/cache/stats")).json()
+
+    totals.sort()
+    return {
+        "requests": len(totals),
+        "rejected": rejected,
+        "wall_s": wall,
+        "rps": len(totals) / wall,
+        "p50_s": statistics.median(totals) if totals else 0.0,
+        "max_s": totals[-1] if totals else 0.0,
+        "ttft_p50_s": statistics.median(firsts) if firsts else 0.0,
+        "cache": cache,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Concurrent /api/query benchmark")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=0.5,
+                    help="stub Langflow seconds per run")
+    ap.add_argument("--stream", action="store_true",
+                    help="use /api/query/stream and report time-to-first-token")
+    ap.add_argument("--cache", action="store_true",
+                    help="keep the answer cache on (repeat rounds become hits)")
+    args = ap.parse_args()
+    if not args.cache:
+        os.environ["ANSWER_CACHE_SIZE"] = "0"
+    # measure the backend, not admission control (429s are still counted)
+    os.environ.setdefault("QUERY_QUEUE_LIMIT", str(args.concurrency * 2))
+
+    tmp = tempfile.TemporaryDirectory(prefix="bench_query_")
+    stub = stub_langflow.start(0, args.latency)
+    os.environ.update({
+        "LANGFLOW_URL": f"http://127.0.0.1:{stub.server_address[1]}",
+        # keep the backend's state out of the cwd
+        "UPLOAD_DIR": os.path.join(tmp.name, "uploads"),
+        "TASK_EVENTS_DB": os.path.join(tmp.name, "task_events.sqlite3"),
+        "SESSION_STORE": os.path.join(tmp.name, "sessions.sqlite3"),
+    })
+    backend, base_url = start_backend()
+    try:
+        res = asyncio.run(run(base_url, args.concurrency, args.rounds, args.stream))
+    finally:
+        backend.should_exit = True
+        stub.shutdown()
+        tmp.cleanup()
+
+    serial = res["requests"] * args.latency
+    route = "/api/query/stream" if args.stream else "/api/query"
+    print(f"{res['requests']} × {route} @ concurrency {args.concurrency}, "
+          f"stub latency {args.latency}s")
+    print(f"  wall   {res['wall_s']:.2f}s  (serial would be ≥ {serial:.2f}s)")
+    print(f"  rps    {res['rps']:.1f}")
+    if res["rejected"]:
+        print(f"  429    {res['rejected']} queries rejected by admission control")
+    print(f"  p50    {res['p50_s'] * 1000:.0f} ms   max {res['max_s'] * 1000:.0f} ms")
+    if args.stream:
+        print(f"  ttft   {res['ttft_p50_s'] * 1000:.0f} ms (p50)")
+    if args.cache:
+        c = res["cache"]
+        print(f"  cache  hit rate {c['hit_rate']:.0%}  "
+              f"saved {c['saved_latency_s']:.2f}s of flow time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# bench_retrieval.py  – dense vs. hybrid (BM25 + vector, RRF, rerank) top-k
+#
+# Uses the RAG flow vector node's LocalIndex, LexicalIndex and
+# fuse_and_rerank on a synthetic SOP corpus whose chunks share topic
+# vocabulary but differ in fault codes, part numbers and IPC addresses –
+# the tokens technicians ask about. The dense retriever is a stand-in
+# (hashed bag of words, digits ignored) that, like a sentence embedding,
+# sees topic but not exact codes. Reports hit@k and MRR of the chunk that
+# holds the asked-for code, and per-query latency.
+#
+#   python benchmarks/bench_retrieval.py --chunks 2000 --queries 300
+
+import argparse
+import hashlib
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import flow_code  # noqa: E402
+
+DIM = 1024
+TOPICS = {
+    "plc": "plc restart controller scan cycle program download run stop mode",
+    "valve": "valve actuator stroke position feedback seat leak solenoid",
+    "pump": "pump impeller seal pressure flow priming cavitation motor",
+    "estop": "emergency stop circuit safety relay reset interlock guard",
+    "network": "network switch ipc address subnet ping cable port profinet",
+}
+
+
+def embed(text: str) -> np.ndarray:
+    vec = np.zeros(DIM, dtype=np.float32)
+    for word in re.findall(r"[a-z]+", text.lower()):
+        vec[int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % DIM] += 1.0
+    return vec
+
+
+def corpus(n: int, seed: int = 0) -> list[tuple[str, str, str]]:
+    """(text, topic, code) per chunk; every code appears in exactly one chunk."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        topic = rng.choice(list(TOPICS))
+        words = TOPICS[topic].split()
+        code = rng.choice([f"F-{i:04d}", f"PN-{i:05d}-{rng.randint(10, 99)}",
+                           f"192.168.{i // 250}.{i % 250 + 1}"])
+        body = " ".join(rng.choices(words, k=60))
+        out.append((f"If {code} is shown: {body}.", topic, code))
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Dense vs. hybrid retrieval benchmark")
+    ap.add_argument("--chunks", type=int, default=2000)
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("-k", type=int, default=4)
+    ap.add_argument("--fetch-k", type=int, default=20)
+    args = ap.parse_args()
+
+    mod = flow_code.load_helpers("RAG for OT", "MongoDBAtlasVector-OORfe")
+    docs = corpus(args.chunks)
+    rng = random.Random(1)
+    asked = rng.sample(range(len(docs)), args.queries)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = mod.LocalIndex(tmp, "bench")
+        lexical = mod.LexicalIndex(tmp, "bench")
+        metas = [{"metadata": {"chunk_hash": str(i), "filename": f"{t}.pdf"}}
+                 for i, (_, t, _) in enumerate(docs)]
+        index.add(np.stack([embed(text) for text, _, _ in docs]),
+                  [text for text, _, _ in docs], metas)
+        lexical.add([mod.Document(page_content=text, metadata=m)
+                     for (text, _, _), m in zip(docs, metas)])
+
+        def dense(q: str, k: int) -> list:
+            return [d for d, _ in index.documents(index.search(embed(q), k))]
+
+        def hybrid(q: str, k: int) -> list:
+            return mod.fuse_and_rerank(q, [dense(q, args.fetch_k), lexical.search(q, args.fetch_k)], k)
+
+        print(f"{args.chunks} chunks, {args.queries} code questions, k={args.k}")
+        for name, retrieve in (("dense", dense), ("hybrid", hybrid)):
+            hits, rr, times = 0, [], []
+            for i in asked:
+                _, topic, code = docs[i]
+                q = f"What does {code} mean on the {topic} and how do I fix it?"
+                t0 = time.perf_counter()
+                got = [d.metadata["metadata"]["chunk_hash"] for d in retrieve(q, args.k)]
+                times.append(time.perf_counter() - t0)
+                hits += str(i) in got
+                rr.append(1 / (got.index(str(i)) + 1) if str(i) in got else 0.0)
+            print(f"  {name:<7} hit@{args.k} {hits / len(asked):.3f}  MRR {statistics.mean(rr):.3f}  "
+                  f"p50 {statistics.median(times) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
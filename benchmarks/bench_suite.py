@@ -0,0 +1,353 @@
+# bench_suite.py  – end-to-end benchmark suite with JSON results for regression checks
+#
+# Boots the backend under uvicorn against the stub Langflow (rich answers
+# with sources and related images) and measures:
+#
+#   * query / stream  – closed-loop load at several concurrency levels:
+#                       p50/p95/p99 latency, throughput, 429s, time-to-first-token
+#   * payload         – cost of normalising a run result and the bytes sent
+#                       as raw result, compact JSON, gzip and msgpack
+#   * ingest          – synthetic SOP PDFs uploaded through /api/upload and
+#                       extracted by the loader's own PDF code in the stub:
+#                       pages/s end to end, upload latency and the latency of
+#                       /api/suggestions from the question bank it builds
+#   * peak RSS        – this process (backend + stub) and its children
+#
+# `--storage s3` keeps the uploads in benchmarks/stub_s3.py instead of on
+# local disk, so ingestion includes staging the objects for the loader.
+#
+# Results go to a JSON file; `--compare` prints the change against an
+# earlier one and exits non-zero when a metric regresses past `--threshold`.
+#
+#   python benchmarks/bench_suite.py --out results.json
+#   python benchmarks/bench_suite.py --quick --out new.json --compare results.json
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", "Backend"))
+
+import bench_query    # noqa: E402
+import stub_langflow  # noqa: E402
+import stub_s3        # noqa: E402
+
+# metric name → True when bigger is better; everything else in the
+# results is context and not compared
+HIGHER_IS_BETTER = ("rps", "pages_per_s")
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "ttft_p50_ms", "ttft_p95_ms",
+                   "normalize_us", "compact_bytes", "gzip_bytes", "msgpack_bytes",
+                   "upload_p95_ms", "suggest_p95_ms", "peak_rss_mb")
+
+
+def pct(values: list[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100) of an unsorted list."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def latency_summary(seconds: list[float], prefix: str = "") -> dict:
+    ms = [s * 1000 for s in seconds]
+    return {f"{prefix}p50_ms": round(pct(ms, 50), 1), f"{prefix}p95_ms": round(pct(ms, 95), 1),
+            f"{prefix}p99_ms": round(pct(ms, 99), 1)}
+
+
+# ── query load ───────────────────────────────────────────────────────────
+async def _query(client, route: str, body: dict) -> tuple[int, float, float | None]:
+    """(status, total seconds, seconds to first token or None)."""
+    t0 = time.perf_counter()
+    if route == "query":
+        r = await client.post("/api/query", json=body)
+        return r.status_code, time.perf_counter() - t0, None
+    first = None
+    async with client.stream("POST", "/api/query/stream", json=body) as r:
+        async for line in r.aiter_lines():
+            if first is None and line.startswith("event: token"):
+                first = time.perf_counter() - t0
+    return r.status_code, time.perf_counter() - t0, first
+
+
+async def load(base_url: str, route: str, concurrency: int, duration: float) -> dict:
+    """Closed loop: `concurrency` workers, each asking distinct questions in
+    its own session (no coalescing, no per-session cap) for `duration` s."""
+    import httpx
+
+    totals: list[float] = []
+    firsts: list[float] = []
+    statuses: dict[int, int] = {}
+
+    async def worker(w: int, client) -> None:
+        i = 0
+        while time.perf_counter() < stop:
+            body = {"query": f"reset PLC after E-stop #{w}-{i}", "session_id": f"suite_{w}"}
+            status, total, first = await _query(client, route, body)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                totals.append(total)
+                if first is not None:
+                    firsts.append(first)
+            i += 1
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as c:
+        t0 = time.perf_counter()
+        stop = t0 + duration
+        await asyncio.gather(*(worker(w, c) for w in range(concurrency)))
+        wall = time.perf_counter() - t0
+
+    res = {"concurrency": concurrency, "requests": sum(statuses.values()), "ok": len(totals),
+           "rejected_429": statuses.get(429, 0),
+           "errors": sum(n for s, n in statuses.items() if s not in (200, 429)),
+           "wall_s": round(wall, 2), "rps": round(len(totals) / wall, 2),
+           **latency_summary(totals)}
+    if route == "stream":
+        res.update(latency_summary(firsts, "ttft_"))
+        res.pop("ttft_p99_ms")
+    return res
+
+
+# ── payload shape ────────────────────────────────────────────────────────
+def payload(images: int, b64: bool, reps: int = 2000) -> dict:
+    import query_response
+
+    result = stub_langflow.run_result("suite", stub_langflow.ANSWER, 0.5, images, b64)
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        compact = query_response.normalize(result, 0.5)
+    normalize_us = (time.perf_counter() - t0) / reps * 1e6
+    compact_raw = json.dumps(compact).encode()
+    res = {"images": images, "b64": b64, "normalize_us": round(normalize_us, 1),
+           "raw_bytes": len(json.dumps(result).encode()), "compact_bytes": len(compact_raw),
+           "gzip_bytes": len(gzip.compress(compact_raw))}
+    if query_response.msgpack is not None:
+        res["msgpack_bytes"] = len(query_response.msgpack.packb(compact, use_bin_type=True))
+    return res
+
+
+# ── ingestion ────────────────────────────────────────────────────────────
+async def ingest(base_url: str, paths: list[str], timeout: float = 600) -> dict:
+    """Upload every PDF to its own session, then wait for all jobs."""
+    import httpx
+
+    uploads: list[float] = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as c:
+        t0 = time.perf_counter()
+        job_ids = []
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                t = time.perf_counter()
+                r = await c.post("/api/upload", data={"session_id": f"suite_ingest_{i}"},
+                                 files={"file": (os.path.basename(path), f, "application/pdf")})
+                uploads.append(time.perf_counter() - t)
+            r.raise_for_status()
+            job_ids.append(r.json()["job_id"])
+
+        jobs: dict[str, dict] = {}
+        while len(jobs) < len(job_ids) and time.perf_counter() - t0 < timeout:
+            for job_id in job_ids:
+                if job_id not in jobs:
+                    job = (await c.get(f"/api/jobs/{job_id}")).json()
+                    if job["status"] in ("done", "failed"):
+                        jobs[job_id] = job
+            await asyncio.sleep(0.05)
+        wall = time.perf_counter() - t0
+
+        suggest, offered = [], 0
+        for i in range(len(paths)):
+            for _ in range(20):
+                t = time.perf_counter()
+                r = await c.post("/api/suggestions", json={
+                    "session_id": f"suite_ingest_{i}", "query": "How do I clear fault F-0231?"})
+                suggest.append(time.perf_counter() - t)
+            offered += len(r.json()["suggestions"])
+
+    pages = sum(j["pages_parsed"] for j in jobs.values())
+    return {"files": len(paths), "failed": sum(j["status"] == "failed" for j in jobs.values()),
+            "timed_out": len(job_ids) - len(jobs), "pages": pages, "wall_s": round(wall, 2),
+            "pages_per_s": round(pages / wall, 1), "upload_p50_ms": round(pct(uploads, 50) * 1000, 1),
+            "upload_p95_ms": round(pct(uploads, 95) * 1000, 1),
+            "suggestions": offered, "suggest_p95_ms": round(pct(suggest, 95) * 1000, 1)}
+
+
+# ── results ──────────────────────────────────────────────────────────────
+def peak_rss_mb() -> dict:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return {"peak_rss_mb": round(own, 1), "children_peak_rss_mb": round(children, 1)}
+
+
+def metadata(args: argparse.Namespace) -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                             capture_output=True, text=True, timeout=10).stdout.strip()
+    except OSError:
+        rev = ""
+    return {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_rev": rev, "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(), "args": vars(args)}
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    """Comparable metrics keyed by path, e.g. query.c16.p95_ms."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    tag = f"c{item['concurrency']}" if "concurrency" in item else \
+                        f"img{item.get('images')}{'_b64' if item.get('b64') else ''}"
+                    flat.update(flatten(item, f"{path}.{tag}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) \
+                and key in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            flat[path] = value
+    return flat
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    """Print per-metric change; return the metrics that got worse by more
+    than `threshold` (a fraction)."""
+    before, after = flatten(old["results"]), flatten(new["results"])
+    regressions = []
+    print(f"\ncompare {old['meta'].get('git_rev') or '?'} → {new['meta'].get('git_rev') or '?'}")
+    for path in sorted(before.keys() & after.keys()):
+        a, b = before[path], after[path]
+        if not a:
+            continue
+        change = (b - a) / a
+        worse = -change if path.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change
+        flag = "  REGRESSION" if worse > threshold else ""
+        if flag:
+            regressions.append(path)
+        print(f"  {path:<34} {a:>10.1f} → {b:>10.1f}  {change:+7.1%}{flag}")
+    return regressions
+
+
+def report(results: dict) -> None:
+    for route in ("query", "stream"):
+        for r in results.get(route, []):
+            extra = f"  ttft p50 {r['ttft_p50_ms']:.0f} ms" if "ttft_p50_ms" in r else ""
+            print(f"  {route:<6} c={r['concurrency']:<3d} {r['rps']:7.1f} rps  "
+                  f"p50 {r['p50_ms']:6.0f}  p95 {r['p95_ms']:6.0f}  p99 {r['p99_ms']:6.0f} ms  "
+                  f"429s {r['rejected_429']}{extra}")
+    for r in results.get("payload", []):
+        print(f"  payload images={r['images']}{' b64' if r['b64'] else ''}: "
+              f"normalize {r['normalize_us']:.0f} µs  raw {r['raw_bytes']:,} B → "
+              f"compact {r['compact_bytes']:,} B (gzip {r['gzip_bytes']:,}"
+              + (f", msgpack {r['msgpack_bytes']:,}" if "msgpack_bytes" in r else "") + ")")
+    if "ingest" in results:
+        r = results["ingest"]
+        print(f"  ingest {r['files']} files / {r['pages']:,} pages in {r['wall_s']:.1f}s  "
+              f"{r['pages_per_s']:.1f} pages/s  upload p95 {r['upload_p95_ms']:.0f} ms  "
+              f"failed {r['failed']}")
+        print(f"  suggest {r['suggestions']} offered, p95 {r['suggest_p95_ms']:.1f} ms")
+    print(f"  peak RSS {results['rss']['peak_rss_mb']:.0f} MB "
+          f"(children {results['rss']['children_peak_rss_mb']:.0f} MB)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="End-to-end benchmark suite")
+    ap.add_argument("--concurrency", default="1,4,16,64",
+                    help="comma-separated concurrency levels")
+    ap.add_argument("--duration", type=float, default=10, help="seconds per load level")
+    ap.add_argument("--latency", type=float, default=0.5, help="stub Langflow seconds per run")
+    ap.add_argument("--images", type=int, default=3, help="related images per stub answer")
+    ap.add_argument("--b64", action="store_true", help="stub inlines images as base64")
+    ap.add_argument("--files", type=int, default=8, help="PDFs to ingest")
+    ap.add_argument("--pages", type=int, default=60, help="pages per PDF")
+    ap.add_argument("--storage", choices=("local", "s3"), default="local",
+                    help="upload storage backend (s3 = in-process stub)")
+    ap.add_argument("--skip", default="", help="comma-separated: query,stream,payload,ingest")
+    ap.add_argument("--quick", action="store_true",
+                    help="levels 1,16, 3 s each, 2×20-page PDFs")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", help="earlier results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.10,
+                    help="relative change counted as a regression")
+    args = ap.parse_args()
+    if args.quick:
+        args.concurrency, args.duration, args.files, args.pages = "1,16", 3, 2, 20
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+    skip = set(filter(None, args.skip.split(",")))
+
+    tmp = tempfile.TemporaryDirectory(prefix="bench_suite_")
+    port = bench_query._free_port()
+    stub = stub_langflow.start(0, args.latency, args.images, args.b64)
+    os.environ.update({
+        "LANGFLOW_URL": f"http://127.0.0.1:{stub.server_address[1]}",
+        "BACKEND_URL": f"http://127.0.0.1:{port}",     # loader progress callbacks
+        "UPLOAD_DIR": os.path.join(tmp.name, "uploads"),
+        "TASK_EVENTS_DB": os.path.join(tmp.name, "task_events.sqlite3"),
+        "SESSION_STORE": os.path.join(tmp.name, "sessions.sqlite3"),
+        "STORAGE_BACKEND": args.storage,
+        "ANSWER_CACHE_SIZE": "0",
+        # measure the backend, not admission control
+        "QUERY_QUEUE_LIMIT": str(max(levels) * 2),
+    })
+    s3 = None
+    if args.storage == "s3":
+        s3 = stub_s3.start()
+        os.environ.update({
+            "S3_BUCKET": "bench",
+            "S3_ENDPOINT_URL": f"http://127.0.0.1:{s3.server_address[1]}",
+            "STAGING_DIR": os.path.join(tmp.name, "staging"),
+        })
+    backend, base_url = bench_query.start_backend(port)
+
+    results: dict = {}
+    try:
+        for route in ("query", "stream"):
+            if route not in skip:
+                results[route] = [asyncio.run(load(base_url, route, c, args.duration))
+                                  for c in levels]
+        if "payload" not in skip:
+            results["payload"] = [payload(args.images, False), payload(args.images, True)]
+        if "ingest" not in skip:
+            import make_sop_pdfs
+            paths = make_sop_pdfs.make_corpus(os.path.join(tmp.name, "corpus"),
+                                              args.files, args.pages)
+            results["ingest"] = asyncio.run(ingest(base_url, paths))
+    finally:
+        backend.should_exit = True
+        stub.shutdown()
+        if s3 is not None:
+            s3.shutdown()
+        time.sleep(0.2)
+        tmp.cleanup()
+    results["rss"] = peak_rss_mb()
+
+    doc = {"meta": metadata(args), "results": results}
+    print(f"stub latency {args.latency}s, {args.images} images/answer"
+          f"{' (base64)' if args.b64 else ''}, {args.storage} storage")
+    report(results)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+        print(f"results → {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), doc, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# bench_vector_index.py  – recall and latency of the local vector index
+#
+# Loads LocalIndex out of the RAG flow's vector-store node, fills it with a
+# clustered synthetic corpus of 1024-dim unit vectors (topics + noise, like
+# SOP chunk embeddings) and compares, per query, exact brute-force search
+# with the IVF partition at several `nprobe` values, plus a filename-
+# filtered search. Recall is top-k overlap with the exact result.
+#
+#   python benchmarks/bench_vector_index.py --rows 20000 --queries 200
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import flow_code  # noqa: E402
+
+
+def corpus(rows: int, dim: int, topics: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, rows)
+    return centers[labels] + 1.5 * rng.normal(size=(rows, dim)).astype(np.float32)
+
+
+def timed(fn, queries) -> tuple[list, list[float]]:
+    results, times = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(fn(q))
+        times.append(time.perf_counter() - t0)
+    return results, times
+
+
+def pct(times: list[float], p: float) -> float:
+    return sorted(times)[min(len(times) - 1, int(p * len(times)))] * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Local vector index recall/latency benchmark")
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--topics", type=int, default=400)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("-k", type=int, default=4, help="results per query (flow default: 4)")
+    args = ap.parse_args()
+
+    mod = flow_code.load_helpers("RAG for OT", "MongoDBAtlasVector-OORfe")
+    vecs = corpus(args.rows, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    picks = rng.choice(args.rows, args.queries, replace=False)
+    queries = vecs[picks] + 1.5 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    files = 50
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = mod.LocalIndex(tmp, "bench")
+        t0 = time.perf_counter()
+        for i in range(0, args.rows, 5000):
+            part = range(i, min(i + 5000, args.rows))
+            index.add(vecs[i : i + 5000], [f"chunk {j}" for j in part],
+                      [{"metadata": {"filename": f"sop_{j % files}.pdf", "chunk_hash": str(j)}}
+                       for j in part])
+        load_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        index.build_ivf()
+        build_s = time.perf_counter() - t0
+        size_mb = sum(os.path.getsize(os.path.join(index.path, f))
+                      for f in os.listdir(index.path)) / 2**20
+        print(f"{args.rows:,} × {args.dim}-dim, k={args.k}: load {load_s:.1f}s, "
+              f"IVF build {build_s:.1f}s, {size_mb:.0f} MB on disk")
+
+        exact, times = timed(lambda q: index.search(q, args.k, exact=True), queries)
+        truth = [{r for r, _ in res} for res in exact]
+        print(f"  {'exact (brute force)':<22} recall 1.000  "
+              f"p50 {pct(times, .5):6.2f} ms  p95 {pct(times, .95):6.2f} ms")
+
+        for nprobe in (1, 4, 8, 16, 32):
+            res, times = timed(lambda q: index.search(q, args.k, nprobe=nprobe), queries)
+            recall = statistics.mean(len(t & {r for r, _ in got}) / args.k
+                                     for t, got in zip(truth, res))
+            print(f"  {f'ivf nprobe={nprobe}':<22} recall {recall:.3f}  "
+                  f"p50 {pct(times, .5):6.2f} ms  p95 {pct(times, .95):6.2f} ms")
+
+        _, times = timed(lambda q: index.search(q, args.k, {"filename": "sop_7.pdf"}), queries)
+        print(f"  {'filename filter':<22} ({args.rows // files} rows) "
+              f"p50 {pct(times, .5):6.2f} ms  p95 {pct(times, .95):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
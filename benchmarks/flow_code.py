@@ -0,0 +1,55 @@
+# flow_code.py  – load helper functions out of a Langflow flow's custom components
+#
+# Custom component code lives inside the flow JSON. The module-level helpers
+# (everything except the Component class and langflow imports) are plain
+# Python, so benchmarks can import and time the exact code Langflow runs.
+# Packages only the Component class uses can be left out with `skip`.
+
+import ast
+import json
+import os
+import sys
+import types
+
+FLOW_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Langflow")
+
+
+def component_code(flow: str, node_id: str) -> str:
+    with open(os.path.join(FLOW_DIR, f"{flow}.json"), encoding="utf-8") as f:
+        nodes = json.load(f)["data"]["nodes"]
+    for n in nodes:
+        if n["data"]["id"] == node_id:
+            return n["data"]["node"]["template"]["code"]["value"]
+    raise KeyError(f"{node_id} not in {flow}")
+
+
+def _imports(node: ast.stmt, packages: tuple[str, ...]) -> bool:
+    if isinstance(node, ast.ImportFrom):
+        return (node.module or "").split(".")[0] in packages
+    if isinstance(node, ast.Import):
+        return any(a.name.split(".")[0] in packages for a in node.names)
+    return False
+
+
+def _langflow_names(tree: ast.Module) -> set[str]:
+    return {a.asname or a.name.split(".")[0]
+            for n in tree.body if _imports(n, ("langflow",)) for a in n.names}
+
+
+def _is_component(node: ast.stmt, langflow: set[str]) -> bool:
+    return isinstance(node, ast.ClassDef) and any(
+        isinstance(b, ast.Name) and b.id in langflow for b in node.bases)
+
+
+def load_helpers(flow: str, node_id: str, skip: tuple[str, ...] = ()) -> types.ModuleType:
+    """Import a component's module-level helpers (and helper classes) as a
+    real module, without langflow and the `skip` packages."""
+    tree = ast.parse(component_code(flow, node_id))
+    langflow = _langflow_names(tree)
+    tree.body = [n for n in tree.body
+                 if not _is_component(n, langflow) and not _imports(n, ("langflow", *skip))]
+    name = f"_flow_{node_id.replace('-', '_')}"
+    mod = types.ModuleType(name)
+    sys.modules[name] = mod          # so process pools can unpickle its functions
+    exec(compile(tree, f"<{flow}:{node_id}>", "exec"), mod.__dict__)
+    return mod
@@ -0,0 +1,66 @@
+# make_sop_pdfs.py  – generate a synthetic SOP corpus for ingestion benchmarks
+#
+# Each PDF mimics an OT manual: numbered headings, troubleshooting steps,
+# fault codes, IPC addresses and a small diagram image on some pages.
+#
+#   python benchmarks/make_sop_pdfs.py out_dir --files 8 --pages 120
+
+import argparse
+import os
+import random
+
+import fitz  # PyMuPDF
+
+WORDS = ("verify inspect reset relay PLC HMI drive encoder breaker interlock "
+         "safety valve pressure sensor firmware module rack network switch "
+         "cabinet terminal fuse contactor motor conveyor axis servo").split()
+
+
+def _diagram(rng: random.Random) -> bytes:
+    """Tiny PNG 'wiring diagram' so pages carry real embedded images."""
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 96, 64), False)
+    pix.set_rect(pix.irect, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return pix.tobytes("png")
+
+
+def page_text(rng: random.Random, doc_no: int, page_no: int) -> str:
+    lines = [f"{page_no}. Procedure SOP-{doc_no:03d}-{page_no:04d}"]
+    for step in range(1, rng.randint(6, 12)):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 18)))
+        lines.append(f"{step}) {words.capitalize()}. Fault code "
+                     f"F-{rng.randint(1000, 9999)} at 10.{doc_no}.{page_no % 255}.{step}.")
+    lines.append("WARNING: Lock out / tag out before opening the cabinet.")
+    return "\n".join(lines)
+
+
+def make_pdf(path: str, doc_no: int, pages: int, image_every: int = 3, seed: int = 0) -> None:
+    rng = random.Random(seed * 1000 + doc_no)
+    doc = fitz.open()
+    for p in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 700), page_text(rng, doc_no, p), fontsize=9)
+        if image_every and p % image_every == 0:
+            page.insert_image(fitz.Rect(50, 710, 194, 806), stream=_diagram(rng))
+    doc.save(path)
+    doc.close()
+
+
+def make_corpus(out_dir: str, files: int, pages: int, seed: int = 0) -> list[str]:
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(files):
+        path = os.path.join(out_dir, f"SOP_{i:03d}.pdf")
+        make_pdf(path, i, pages, seed=seed)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate synthetic SOP PDFs")
+    ap.add_argument("out_dir")
+    ap.add_argument("--files", type=int, default=8)
+    ap.add_argument("--pages", type=int, default=120)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    for p in make_corpus(args.out_dir, args.files, args.pages, args.seed):
+        print(p)
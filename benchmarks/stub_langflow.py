@@ -0,0 +1,233 @@
+# stub_langflow.py  – tiny stand-in for the Langflow run API
+#
+# Mimics POST /api/v1/run/<flow-id> closely enough for the backend:
+# sleeps for a configurable "generation" time and returns a run result
+# shaped like the RAG flow's (outputs → outputs → results → message).
+# With `?stream=true` it emits Langflow-style token events spread over
+# the same generation time, followed by an `end` event with the result.
+# Answers carry what the RAG flow's AnswerFormatter adds (sources marker,
+# related-image list) – `--b64` inlines the images as base64 like chunks
+# ingested before the image store. A run whose input is a folder is treated
+# as the Data_Loader flow: the folder's PDFs are extracted with the flow's
+# own FolderFileReader code (PyMuPDF), progress is POSTed to the
+# `progress_url` tweak like the real loader does, and the result carries
+# the question-bank agent's suggestions for each file.
+#
+#   python benchmarks/stub_langflow.py --port 7860 --latency 0.5
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ANSWER = (
+    "1. Verify the E-stop circuit is reset and the safety relay shows READY.\n"
+    "2. Inspect the PLC fault log for code F-0231.\n"
+    "3. Run a warm restart from the HMI maintenance screen.\n"
+)
+
+
+QUESTIONS = ["How do I clear fault F-0231 in {}?", "Where is the safety relay mounted per {}?",
+             "What is the HMI maintenance password policy in {}?"]
+
+
+def formatted_answer(text: str, images: int = 3, b64: bool = False) -> str:
+    """The RAG flow's chat output: answer, sources marker and related-image
+    list (AnswerFormatter)."""
+    sources = [{"filename": "20250101_080000_SOP_000.pdf", "page": p} for p in (3, 4, 7)]
+    out = text + f"\n<!--sources:{json.dumps(sources)}-->"
+    if images:
+        rng = random.Random(len(text))
+        srcs = [
+            "data:image/png;base64," + base64.b64encode(rng.randbytes(24_000)).decode() if b64
+            else "/api/images/" + hashlib.sha256(f"diagram-{i}".encode()).hexdigest()
+            for i in range(images)
+        ]
+        items = "\n".join(f'<li><img src="{src}" style="max-width:300px;border:1px solid #ccc;" '
+                          f'alt="Image {i + 1} thumbnail" /></li>' for i, src in enumerate(srcs))
+        out += f"<br><br><strong>Related images:</strong><ol style='padding-left:18px'>{items}</ol>"
+    return out
+
+
+def question_bank(files: list[str]) -> str:
+    """The loader's suggestion agent output for the files a run read."""
+    items = [{"question": q.format(os.path.splitext(f)[0]), "source": f}
+             for f in files for q in QUESTIONS]
+    return "```json\n" + json.dumps({"suggestions": items}) + "\n```"
+
+
+def _output(session_id: str, text: str, component_id: str, seconds: float) -> dict:
+    message = {
+        "text": text,
+        "sender": "Machine",
+        "sender_name": "AI",
+        "session_id": session_id,
+        "data": {"text": text},
+    }
+    return {
+        "inputs": {"input_value": ""},
+        "outputs": [{
+            "results": {"message": message},
+            "artifacts": {"message": text, "type": "object"},
+            "outputs": {"message": {"message": text, "type": "text"}},
+            "logs": {"message": []},
+            "messages": [{"message": text, "type": "text"}],
+            "component_display_name": "Chat Output",
+            "component_id": component_id,
+            "timedelta": seconds,
+            "duration": f"{seconds * 1000:.0f} ms",
+        }],
+    }
+
+
+def run_result(session_id: str, text: str, seconds: float = 0.0,
+               images: int = 0, b64: bool = False) -> dict:
+    """Run-result body in the shape Langflow returns for a chat flow,
+    including each output component's build time (`timedelta`). With
+    `images` it has both RAG chat outputs: the formatted answer and the
+    raw LLM text."""
+    if not images:
+        return {"session_id": session_id,
+                "outputs": [_output(session_id, text, "ChatOutput-E1fyZ", seconds)]}
+    return {
+        "session_id": session_id,
+        "outputs": [
+            _output(session_id, formatted_answer(text, images, b64), "ChatOutput-E1fyZ", seconds),
+            _output(session_id, text, "ChatOutput-AnsSt", seconds * 0.8),
+        ],
+    }
+
+
+def _report(url: str, **counters) -> None:
+    if not url:
+        return
+    req = urllib.request.Request(url, data=json.dumps(counters).encode(),
+                                 headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        urllib.request.urlopen(req, timeout=2).close()
+    except OSError:
+        pass
+
+
+def ingest(folder: str, progress_url: str = "", chunks_per_page: int = 3,
+           image_dir: str = "") -> tuple[int, list[str]]:
+    """Extract every PDF in `folder` like the loader's FolderFileReader and
+    report progress; returns pages parsed and the file names. Without
+    PyMuPDF each file counts as one page."""
+    paths = sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                   if not f.startswith(".") and os.path.isfile(os.path.join(folder, f)))
+    try:
+        import flow_code
+        reader = flow_code.load_helpers("Data_Loader for OT", "FolderFileReader-X3ZHU")
+    except ImportError:
+        reader = None
+    pdfs = [p for p in paths if p.lower().endswith(".pdf")]
+    pages = len(paths) - len(pdfs) if reader else len(paths)
+    if reader and pdfs:
+        for _ in reader.iter_pdf_pages(pdfs, image_dir or reader.image_store_dir(folder)):
+            pages += 1
+            if pages % 50 == 0:
+                _report(progress_url, pages_parsed=pages)
+    _report(progress_url, pages_parsed=pages, chunks_split=pages * chunks_per_page)
+    return pages, [os.path.basename(p) for p in paths]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.5        # seconds per run (class-level so the CLI can tweak it)
+    first_token = 0.05   # retrieval + prompt time before the first streamed token
+    answer  = ANSWER
+    images  = 0          # related images per answer (0 = plain one-output result)
+    b64     = False      # inline base64 images instead of /api/images/<id>
+
+    def log_message(self, *args):   # keep benchmark output readable
+        pass
+
+    def _send_json(self, code: int, body) -> None:
+        raw = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _send_stream(self, session_id: str) -> None:
+        tokens = re.findall(r"\S+\s*", self.answer)
+        gap = max(self.latency - self.first_token, 0) / max(len(tokens), 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def emit(event: str, data: dict) -> None:
+            self.wfile.write((json.dumps({"event": event, "data": data}) + "\n\n").encode())
+            self.wfile.flush()
+
+        time.sleep(self.first_token)
+        for i, tok in enumerate(tokens):
+            emit("token", {"chunk": tok, "id": f"stub-{i}", "timestamp": time.time()})
+            time.sleep(gap)
+        emit("end", {"result": self._result(session_id)})
+
+    def _result(self, session_id: str) -> dict:
+        return run_result(session_id, self.answer, self.latency, self.images, self.b64)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if not url.path.startswith("/api/v1/run/"):
+            self._send_json(404, {"detail": "Not Found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        session_id = payload.get("session_id", "")
+
+        folder = str(payload.get("input_value", ""))
+        if os.path.isdir(folder):               # Data_Loader flow
+            tweaks = [t for t in (payload.get("tweaks") or {}).values() if isinstance(t, dict)]
+            progress = next((t["progress_url"] for t in tweaks if t.get("progress_url")), "")
+            image_dir = next((t["image_dir"] for t in tweaks if t.get("image_dir")), "")
+            t0 = time.perf_counter()
+            pages, files = ingest(folder, progress, image_dir=image_dir)
+            self._send_json(200, run_result(session_id, question_bank(files),
+                                            time.perf_counter() - t0))
+            return
+        if parse_qs(url.query).get("stream") == ["true"]:
+            self._send_stream(session_id)
+            return
+        time.sleep(self.latency)
+        self._send_json(200, self._result(session_id))
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256     # default backlog of 5 drops bursts of connects
+
+
+def start(port: int = 0, latency: float = 0.5, images: int = 0, b64: bool = False) -> StubServer:
+    """Start the stub on a background thread; port 0 picks a free one."""
+    handler = type("Handler", (StubHandler,), {"latency": latency, "images": images, "b64": b64})
+    server = StubServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Stub Langflow run API")
+    ap.add_argument("--port", type=int, default=7860)
+    ap.add_argument("--latency", type=float, default=0.5)
+    ap.add_argument("--images", type=int, default=3, help="related images per answer")
+    ap.add_argument("--b64", action="store_true", help="inline images as base64")
+    args = ap.parse_args()
+    srv = start(args.port, args.latency, args.images, args.b64)
+    print(f"stub Langflow on http://127.0.0.1:{srv.server_address[1]} "
+          f"(latency {args.latency}s) – Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -0,0 +1,122 @@
+# stub_s3.py  – tiny in-memory stand-in for an S3-compatible object store
+#
+# Enough of the S3 REST API for Backend/storage.py (path-style URLs): PUT,
+# GET, HEAD and DELETE of objects and ListObjectsV2 with prefix and
+# continuation tokens. Signatures are not checked. Lets the backend run
+# with STORAGE_BACKEND=s3 without MinIO or AWS:
+#
+#   python benchmarks/stub_s3.py --port 9000
+#   STORAGE_BACKEND=s3 S3_BUCKET=ot S3_ENDPOINT_URL=http://127.0.0.1:9000 uvicorn main:app
+
+import argparse
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+
+class StubS3Handler(BaseHTTPRequestHandler):
+    objects: dict = {}          # (bucket, key) → bytes; per server, see start()
+    page_size = 1000            # ListObjectsV2 MaxKeys
+
+    def log_message(self, *args):
+        pass
+
+    def _target(self) -> tuple[str, str, dict]:
+        url = urlsplit(self.path)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        return bucket, key, {k: v[0] for k, v in parse_qs(url.query).items()}
+
+    def _send(self, code: int, body: bytes = b"", headers: dict | None = None,
+              head: bool = False) -> None:
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)) if not head else
+                         (headers or {}).get("Content-Length", "0"))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            out = b""
+            while size := int(self.rfile.readline().split(b";")[0], 16):
+                out += self.rfile.read(size)
+                self.rfile.readline()
+            self.rfile.readline()
+            return out
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_PUT(self):
+        bucket, key, _ = self._target()
+        data = self._read_body()
+        self.objects[(bucket, key)] = data
+        self._send(200, headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+
+    def do_DELETE(self):
+        bucket, key, _ = self._target()
+        self.objects.pop((bucket, key), None)
+        self._send(204)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head: bool = False):
+        bucket, key, query = self._target()
+        if not key and query.get("list-type") == "2":
+            self._list(bucket, query)
+            return
+        data = self.objects.get((bucket, key))
+        if data is None:
+            self._send(404, b"<Error><Code>NoSuchKey</Code></Error>", head=head)
+            return
+        self._send(200, data, head=head, headers={
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(len(data)),
+            "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+            "Last-Modified": formatdate(usegmt=True),
+        })
+
+    def _list(self, bucket: str, query: dict) -> None:
+        prefix, after = query.get("prefix", ""), query.get("continuation-token", "")
+        keys = sorted(k for b, k in self.objects if b == bucket and k.startswith(prefix) and k > after)
+        page, more = keys[: self.page_size], len(keys) > self.page_size
+        items = "".join(
+            f"<Contents><Key>{escape(k)}</Key><Size>{len(self.objects[(bucket, k)])}</Size>"
+            f"<ETag>&quot;{hashlib.md5(self.objects[(bucket, k)]).hexdigest()}&quot;</ETag></Contents>"
+            for k in page)
+        token = f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>" if more else ""
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+                f"<KeyCount>{len(page)}</KeyCount><IsTruncated>{str(more).lower()}</IsTruncated>"
+                f"{token}{items}</ListBucketResult>").encode()
+        self._send(200, body, headers={"Content-Type": "application/xml"})
+
+
+class StubS3Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def start(port: int = 0, page_size: int = 1000) -> StubS3Server:
+    """Start the stub on a background thread; port 0 picks a free one."""
+    handler = type("Handler", (StubS3Handler,), {"objects": {}, "page_size": page_size})
+    server = StubS3Server(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Stub S3-compatible object store")
+    ap.add_argument("--port", type=int, default=9000)
+    args = ap.parse_args()
+    srv = start(args.port)
+    print(f"stub S3 on http://127.0.0.1:{srv.server_address[1]} – Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
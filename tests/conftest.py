@@ -0,0 +1,10 @@
+# conftest.py  – put the backend's flat modules (and the benchmark stubs) on sys.path
+#
+# The backend runs from Backend/ (`uvicorn main:app`) and imports its modules
+# by bare name; the tests do the same.
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "Backend"), os.path.join(ROOT, "benchmarks")]
@@ -0,0 +1,86 @@
+# test_answer_cache.py  – LRU, TTL, invalidation and cross-worker sync
+
+import asyncio
+
+import answer_cache
+from answer_cache import AnswerCache
+
+
+def get(cache: AnswerCache, session_id: str, query: str):
+    return asyncio.run(cache.get(session_id, query))
+
+
+def fill(cache: AnswerCache, session_id: str, query: str, response="answer"):
+    cache.put(get(cache, session_id, query), response, latency=1.0)
+
+
+def test_normalized_hit():
+    cache = AnswerCache(size=4, ttl=0)
+    fill(cache, "s", "How do I reset the pump?")
+    lookup = get(cache, "s", "  how do I reset   the PUMP ")
+    assert lookup.hit and lookup.response == "answer"
+    assert not get(cache, "other", "how do I reset the pump").hit
+    assert cache.stats()["hits"] == 1 and cache.stats()["saved_latency_s"] == 1.0
+
+
+def test_lru_evicts_least_recently_used():
+    cache = AnswerCache(size=2, ttl=0)
+    fill(cache, "s", "a")
+    fill(cache, "s", "b")
+    assert get(cache, "s", "a").hit         # "b" is now the oldest
+    fill(cache, "s", "c")
+    assert get(cache, "s", "a").hit and get(cache, "s", "c").hit
+    assert not get(cache, "s", "b").hit
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    cache = AnswerCache(size=4, ttl=60)
+    fill(cache, "s", "q")
+    now[0] += 59
+    assert get(cache, "s", "q").hit
+    now[0] += 2
+    assert not get(cache, "s", "q").hit
+    assert cache.stats()["entries"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = AnswerCache(size=0)
+    fill(cache, "s", "q")
+    assert not get(cache, "s", "q").hit and cache.stats()["entries"] == 0
+
+
+def test_invalidate_one_session_or_all():
+    cache = AnswerCache(size=8, ttl=0)
+    fill(cache, "a", "q")
+    fill(cache, "b", "q")
+    cache.invalidate("a")
+    assert not get(cache, "a", "q").hit and get(cache, "b", "q").hit
+    cache.invalidate()
+    assert not get(cache, "b", "q").hit
+
+
+def test_put_after_invalidation_is_dropped():
+    cache = AnswerCache(size=8, ttl=0)
+    lookup = get(cache, "s", "q")
+    cache.invalidate("s")                   # an ingestion finished mid-run
+    cache.put(lookup, "stale", latency=1.0)
+    assert not get(cache, "s", "q").hit
+
+
+def test_sync_follows_other_workers_counters():
+    cache = AnswerCache(size=8, ttl=0)
+    cache.sync("a", (0, 0))
+    cache.sync("b", (0, 0))
+    fill(cache, "a", "q")
+    fill(cache, "b", "q")
+
+    cache.sync("a", (0, 0))                 # nothing moved
+    assert get(cache, "a", "q").hit
+    cache.sync("a", (0, 1))                 # session a re-ingested elsewhere
+    assert not get(cache, "a", "q").hit and get(cache, "b", "q").hit
+
+    fill(cache, "a", "q")
+    cache.sync("b", (1, 0))                 # a full clear elsewhere
+    assert not get(cache, "a", "q").hit and not get(cache, "b", "q").hit
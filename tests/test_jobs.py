@@ -0,0 +1,143 @@
+# test_jobs.py  – the background ingestion queue: job states, joining and progress
+
+import asyncio
+
+import pytest
+
+from jobs import JobQueue
+from session_store import SQLiteSessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    yield s
+    asyncio.run(s.close())
+
+
+async def settle(queue: JobQueue) -> None:
+    await asyncio.wait_for(queue._queue.join(), 5)
+
+
+def test_states_and_joining():
+    async def run():
+        gate, started = asyncio.Event(), asyncio.Event()
+
+        async def runner(job):
+            started.set()
+            await gate.wait()
+            queue.progress(job.id, {"pages_parsed": 3, "chunks_split": 7})
+            return {"ok": True}
+
+        queue = JobQueue(runner, workers=1)
+        job = queue.submit("s1", "/up/s1", "a.pdf")
+        assert job.status == "queued" and queue.pending("s1") is job
+        assert queue.submit("s1", "/up/s1", "b.pdf") is job          # joins the queued run
+        assert job.files == ["a.pdf", "b.pdf"] and queue.queued() == 1
+
+        queue.start()
+        try:
+            await asyncio.wait_for(started.wait(), 5)
+            assert job.status == "running" and job.started_at is not None
+            assert queue.pending("s1") is None
+            later = queue.submit("s1", "/up/s1", "c.pdf")              # folder is being read
+            assert later is not job and later.files == ["c.pdf"]
+
+            gate.set()
+            await settle(queue)
+        finally:
+            await queue.stop()
+
+        assert job.status == later.status == "done" and job.finished
+        assert job.response == {"ok": True} and job.error is None
+        status = job.to_dict()
+        assert status["job_id"] == job.id and status["files"] == ["a.pdf", "b.pdf"]
+        # the stock vector-store node embeds and stores every split chunk
+        assert (status["pages_parsed"], status["chunks_split"],
+                status["chunks_embedded"], status["chunks_stored"]) == (3, 7, 7, 7)
+
+    asyncio.run(run())
+
+
+def test_failures_do_not_stop_the_worker():
+    async def run():
+        async def runner(job):
+            if job.session_id == "bad":
+                raise RuntimeError("flow down")
+            if job.session_id == "err":
+                return {"error": "no files"}
+            return {}
+
+        queue = JobQueue(runner, workers=1)
+        jobs = [queue.submit(s, f"/up/{s}", "a.pdf") for s in ("bad", "err", "ok")]
+        queue.start()
+        try:
+            await settle(queue)
+        finally:
+            await queue.stop()
+        assert [j.status for j in jobs] == ["failed", "failed", "done"]
+        assert jobs[0].error == "RuntimeError: flow down" and jobs[1].error == "no files"
+        assert jobs[0].counters["chunks_stored"] == 0
+
+    asyncio.run(run())
+
+
+def test_progress_only_moves_forward():
+    queue = JobQueue(lambda job: None)
+    job = queue.submit("s1", "/up/s1", "a.pdf")
+    assert queue.progress(job.id, {"pages_parsed": 5, "chunks_split": 2}) is job
+    queue.progress(job.id, {"pages_parsed": 3, "chunks_split": True, "note": "x"})
+    assert job.counters == {"pages_parsed": 5, "chunks_split": 2,
+                            "chunks_embedded": 0, "chunks_stored": 0}
+    assert queue.progress("nope", {"pages_parsed": 1}) is None
+
+
+def test_history_is_pruned():
+    async def run():
+        async def runner(job):
+            return {}
+
+        queue = JobQueue(runner, workers=1, history=2)
+        jobs = [queue.submit(f"s{i}", f"/up/s{i}", "a.pdf") for i in range(4)]
+        queue.start()
+        try:
+            await settle(queue)
+        finally:
+            await queue.stop()
+        assert [queue.get(j.id) for j in jobs] == [None, None, jobs[2], jobs[3]]
+
+    asyncio.run(run())
+
+
+def test_status_and_progress_across_workers(store):
+    async def run():
+        gate = asyncio.Event()
+
+        async def runner(job):
+            await gate.wait()
+            return {}
+
+        owner, other = JobQueue(runner, store, workers=1), JobQueue(runner, store, workers=1)
+        job = owner.submit("s1", "/up/s1", "a.pdf")
+        await owner.publish(job)
+        assert (await other.lookup(job.id))["status"] == "queued"
+        assert not await other.report("nope", {"pages_parsed": 1})
+
+        owner.start()
+        try:
+            # progress reported to the other worker reaches the owner's status
+            assert await other.report(job.id, {"pages_parsed": 4, "chunks_split": 9})
+            assert await other.report(job.id, {"pages_parsed": 2})
+            status = await other.lookup(job.id)
+            assert (status["pages_parsed"], status["chunks_split"]) == (4, 9)
+            gate.set()
+            await settle(owner)
+        finally:
+            await owner.stop()
+
+        status = await other.lookup(job.id)
+        assert status["status"] == "done"
+        assert (status["pages_parsed"], status["chunks_stored"]) == (4, 9)
+        assert await owner.lookup(job.id) == status
+
+    asyncio.run(run())
@@ -0,0 +1,102 @@
+# test_query_response.py  – the compact /api/query payload and its encodings
+
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.testclient import TestClient
+
+import query_response
+from query_response import normalize
+
+FORMATTED = (
+    "Close valve V-12 before the reset."
+    '<!--sources:[{"filename": "20250101_120000_pump.pdf", "page": 3},'
+    ' {"filename": "20250101_120000_pump.pdf", "page": 3}, {"filename": "valve.pdf", "page": 1}]-->'
+    '<br><strong>Related images:</strong><ol><li><img src="/api/images/abc"></li></ol>'
+)
+RAW = "Close valve V-12 before the reset. (raw LLM text)"
+
+
+def run_result(*outputs: tuple[str, str]) -> dict:
+    return {"outputs": [{"outputs": [
+        {"component_id": cid, "results": {"message": {"text": text}}} for cid, text in outputs
+    ]}]}
+
+
+@pytest.mark.parametrize("order", [
+    [("ChatOutput-E1fyZ", FORMATTED), ("ChatOutput-AnsSt", RAW)],
+    [("ChatOutput-AnsSt", RAW), ("ChatOutput-E1fyZ", FORMATTED)],
+])
+def test_answer_comes_from_the_formatted_output_in_any_order(order):
+    payload = normalize(run_result(*order), flow_s=1.5, answer_node="ChatOutput-E1fyZ")
+    assert payload["answer"] == "Close valve V-12 before the reset."
+    assert payload["sources"] == [{"filename": "pump.pdf", "page": 3},
+                                  {"filename": "valve.pdf", "page": 1}]
+    assert payload["images"] == ["/api/images/abc"]
+    assert payload["timings"]["flow_ms"] == 1500.0
+
+
+def test_falls_back_to_the_first_output():
+    payload = normalize(run_result(("ChatOutput-other", RAW), ("ChatOutput-AnsSt", "second")),
+                        answer_node="ChatOutput-E1fyZ")
+    assert payload["answer"] == RAW and payload["sources"] == []
+    assert normalize("plain text")["answer"] == "plain text"
+    assert normalize(None)["answer"] == ""
+
+
+def test_suggestions_come_from_any_output():
+    block = '```json\n{"suggestions": ["How do I purge the line?", ""]}\n```'
+    payload = normalize(run_result(("ChatOutput-AnsSt", block), ("ChatOutput-E1fyZ", FORMATTED)),
+                        answer_node="ChatOutput-E1fyZ")
+    assert payload["suggestions"] == ["How do I purge the line?"]
+
+
+def test_malformed_source_markers_are_skipped():
+    text = ('answer<!--sources:not json--><!--sources:{"filename": "a.pdf"}-->'
+            '<!--sources:["a.pdf", 3, null, {"filename": "b.pdf", "page": 2}]-->')
+    payload = normalize(text)
+    assert payload["answer"] == "answer"
+    assert payload["sources"] == [{"filename": "b.pdf", "page": 2}]
+
+
+def encoding_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=100)
+
+    @app.get("/answer")
+    async def answer(request: Request):
+        return query_response.encode(request, normalize(FORMATTED * 20))
+
+    return TestClient(app)
+
+
+def test_json_and_gzip():
+    client = encoding_client()
+    plain = client.get("/answer", headers={"Accept-Encoding": "identity"})
+    assert plain.headers["content-type"] == "application/json"
+    assert "content-encoding" not in plain.headers
+    assert plain.json()["sources"][0] == {"filename": "pump.pdf", "page": 3}
+
+    zipped = client.get("/answer", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.json() == plain.json()            # decoded by the client
+    assert int(zipped.headers["content-length"]) < len(plain.content)
+
+
+def test_msgpack_without_the_package_falls_back_to_json(monkeypatch):
+    monkeypatch.setattr(query_response, "msgpack", None)
+    r = encoding_client().get("/answer", headers={"Accept": query_response.MSGPACK})
+    assert r.headers["content-type"] == "application/json"
+    assert json.loads(r.content)["answer"]
+
+
+def test_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+    client = encoding_client()
+    r = client.get("/answer", headers={"Accept": query_response.MSGPACK, "Accept-Encoding": "gzip"})
+    assert r.headers["content-type"] == query_response.MSGPACK
+    assert r.headers["content-encoding"] == "gzip"
+    assert msgpack.unpackb(r.content, raw=False) == \
+        client.get("/answer", headers={"Accept-Encoding": "identity"}).json()
@@ -0,0 +1,78 @@
+# test_question_bank.py  – follow-up questions kept in the session store and ranked per turn
+
+import asyncio
+
+import pytest
+
+from question_bank import QuestionBank
+from session_store import SQLiteSessionStore
+
+A = "20250101_120000_pump manual.pdf"
+B = "20250102_090000_relay guide.pdf"
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    yield s
+    asyncio.run(s.close())
+
+
+def test_update_merges_by_source(store):
+    async def run():
+        bank = QuestionBank(store)
+        items = [{"question": "How do I prime the pump?", "source": A},
+                 {"question": "How do I reset the relay?", "source": "relay guide.pdf"},
+                 {"question": "how do i prime the pump", "source": A}]          # same question
+        assert await bank.update("s1", [A, B], [A, B], items) == 2
+        assert await store.get("questions", "s1") == [
+            {"question": "How do I prime the pump?", "source": A},
+            {"question": "How do I reset the relay?", "source": B},          # display name mapped
+        ]
+
+        # a re-run over A replaces A's questions and keeps B's
+        await bank.update("s1", [A, B], [A], [{"question": "What is the pump's max head?"}])
+        assert [q["question"] for q in await bank.load("s1")] == [
+            "What is the pump's max head?", "How do I reset the relay?"]
+
+        # B is gone from the session: its questions go with it
+        assert await bank.update("s1", [A], [], []) == 1
+        assert await bank.load("s2") == []
+
+    asyncio.run(run())
+
+
+def test_update_keeps_the_limit(store):
+    async def run():
+        bank = QuestionBank(store, limit=3)
+        items = [{"question": f"Question number {i}?", "source": A} for i in range(5)]
+        assert await bank.update("s1", [A], [A], items) == 3
+        assert len(await bank.load("s1")) == 3
+
+    asyncio.run(run())
+
+
+def test_suggest_ranking(store):
+    async def run():
+        bank = QuestionBank(store)
+        await store.put("questions", "s1", [
+            {"question": "How often should the pump filter be replaced?", "source": A},
+            {"question": "What does fault F-0231 mean on the relay?", "source": B},
+            {"question": "Which torque applies to the relay terminals?", "source": B},
+            {"question": "How do I drain the pump housing?", "source": A},
+        ])
+        # fault codes shared with the turn rank first, then question and answer overlap
+        assert (await bank.suggest("s1", "The relay shows F-0231", "Check the relay terminals.", k=2)
+                == ["What does fault F-0231 mean on the relay?",
+                    "Which torque applies to the relay terminals?"])
+        # asked questions and the query itself are skipped
+        assert await bank.suggest("s1", "How do I drain the pump housing?", "",
+                                  asked=["How often should the pump filter be replaced?"], k=1) \
+            == ["What does fault F-0231 mean on the relay?"]
+        # no overlap: the bank's order
+        assert await bank.suggest("s1", "hello", k=2) == [
+            "How often should the pump filter be replaced?", "What does fault F-0231 mean on the relay?"]
+        assert await bank.suggest("s2", "relay") == []
+        assert await bank.suggest("s1", "relay", k=0) == []
+
+    asyncio.run(run())
@@ -0,0 +1,135 @@
+# test_scheduler.py  – admission control, request coalescing and priority slots
+
+import asyncio
+
+import pytest
+
+from scheduler import Overloaded, PrioritySlots, Scheduler
+
+
+def test_admit_caps_sessions_and_total():
+    s = Scheduler(global_limit=3, session_limit=2)
+    a1, a2 = s.admit("a"), s.admit("a")
+    with pytest.raises(Overloaded, match="session"):
+        s.admit("a")
+    b1 = s.admit("b")
+    with pytest.raises(Overloaded, match="busy"):
+        s.admit("c")
+    assert s.stats() == {"inflight": 3, "sessions": 2, "coalescing": 0}
+
+    a1()
+    a1()                                    # release is idempotent
+    assert s.inflight == 2
+    s.admit("c")()
+    a2(), b1()
+    assert s.stats() == {"inflight": 0, "sessions": 0, "coalescing": 0}
+
+
+def test_followers_get_the_leaders_answer():
+    async def run():
+        s = Scheduler()
+        assert s.follow("k") is None
+        flight = s.lead("k")
+        followers = [s.follow("k") for _ in range(3)]
+        assert all(f is flight for f in followers)
+        s.land("k", flight, "answer")
+        assert [await asyncio.shield(f) for f in followers] == ["answer"] * 3
+        assert s.follow("k") is None
+
+    asyncio.run(run())
+
+
+def test_failed_run_lands_none():
+    async def run():
+        s = Scheduler()
+        flight = s.lead("k")
+        follower = s.follow("k")
+        s.land("k", flight)
+        assert await follower is None
+
+    asyncio.run(run())
+
+
+def test_land_twice_is_harmless():
+    async def run():
+        s = Scheduler()
+        flight = s.lead("k")
+        s.land("k", flight, "first")
+        s.land("k", flight)                 # e.g. a stream's `end` and its finally
+        assert flight.result() == "first"
+
+    asyncio.run(run())
+
+
+def test_late_land_leaves_a_newer_flight_alone():
+    async def run():
+        s = Scheduler()
+        old = s.lead("k")
+        s.land("k", old, "old")
+        new = s.lead("k")                   # next identical question, new run
+        s.land("k", old)                    # the first leader's cleanup, late
+        assert s.follow("k") is new and not new.done()
+        s.land("k", new, "new")
+        assert new.result() == "new" and s.follow("k") is None
+
+    asyncio.run(run())
+
+
+def test_interactive_waiters_go_before_bulk():
+    async def run():
+        slots = PrioritySlots(capacity=1, bulk_limit=1)
+        await slots.acquire("interactive")
+        order = []
+
+        async def wait(priority):
+            async with slots.slot(priority):
+                order.append(priority)
+
+        bulk = asyncio.create_task(wait("bulk"))
+        await asyncio.sleep(0)
+        chat = asyncio.create_task(wait("interactive"))
+        await asyncio.sleep(0)
+        assert slots.waiting() == 2
+        slots.release("interactive")
+        await asyncio.gather(bulk, chat)
+        assert order == ["interactive", "bulk"]
+        assert slots.held == 0
+
+    asyncio.run(run())
+
+
+def test_bulk_is_capped_but_interactive_is_not():
+    async def run():
+        slots = PrioritySlots(capacity=3, bulk_limit=1)
+        await slots.acquire("bulk")
+        second = asyncio.create_task(slots.acquire("bulk"))
+        await asyncio.sleep(0)
+        assert not second.done()            # one bulk run at most
+        await slots.acquire("interactive")
+        await slots.acquire("interactive")
+        assert slots.held == 3
+        slots.release("bulk")
+        await second
+        assert slots.held == 3
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiters_give_their_slot_back():
+    async def run():
+        slots = PrioritySlots(capacity=1, bulk_limit=1)
+        await slots.acquire()
+        queued = asyncio.create_task(slots.acquire())
+        await asyncio.sleep(0)
+        queued.cancel()                     # cancelled while waiting
+        granted = asyncio.create_task(slots.acquire())
+        await asyncio.sleep(0)
+        slots.release()                     # handed to `granted` …
+        granted.cancel()                    # … which is cancelled before it runs
+        for task in (queued, granted):
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        assert slots.held == 0 and slots.waiting() == 0
+        await asyncio.wait_for(slots.acquire(), 1)
+
+    asyncio.run(run())
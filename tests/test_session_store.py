@@ -0,0 +1,78 @@
+# test_session_store.py  – the SQLite session store shared by backend workers
+
+import asyncio
+
+import pytest
+
+from session_store import SQLiteSessionStore, open_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    yield s
+    asyncio.run(s.close())
+
+
+def test_documents(store):
+    async def run():
+        assert await store.get("files", "s1") is None
+        await store.put("files", "s1", ["a.pdf"])
+        await store.put("files", "s2", {"n": 1})
+        await store.put("files", "s1", ["a.pdf", "b.pdf"])
+        assert await store.get("files", "s1") == ["a.pdf", "b.pdf"]
+        assert await store.keys("files") == ["s2", "s1"]      # oldest write first
+        await store.delete("files", "s1")
+        assert await store.get("files", "s1") is None
+        assert await store.keys("files") == ["s2"]
+
+    asyncio.run(run())
+
+
+def test_counters(store):
+    async def run():
+        assert [await store.incr("corpus", "s1") for _ in range(3)] == [1, 2, 3]
+        assert await store.incr("corpus", "s2") == 1
+
+    asyncio.run(run())
+
+
+def test_lists(store):
+    async def run():
+        assert await store.append("history", "s1", [{"i": 0}, {"i": 1}]) == 2
+        assert await store.append("history", "s1", [{"i": 2}]) == 3
+        assert await store.length("history", "s1") == 3
+        assert await store.items("history", "s1") == [{"i": 0}, {"i": 1}, {"i": 2}]
+        assert await store.items("history", "s1", 1, 2) == [{"i": 1}]
+        assert await store.items("history", "s1", 2, 1) == []
+        await store.delete("history", "s1")
+        assert await store.length("history", "s1") == 0
+
+    asyncio.run(run())
+
+
+def test_claims(store):
+    async def run():
+        assert await store.claim("ingest:s1", "w1", ttl=60)
+        assert not await store.claim("ingest:s1", "w2", ttl=60)
+        assert await store.claim("ingest:s1", "w1", ttl=60)      # renewal
+        await store.release("ingest:s1", "w2")                   # not the owner
+        assert not await store.claim("ingest:s1", "w2", ttl=60)
+        await store.release("ingest:s1", "w1")
+        assert await store.claim("ingest:s1", "w2", ttl=60)
+        assert await store.claim("expired", "w1", ttl=-1)
+        assert await store.claim("expired", "w2", ttl=60)       # lease ran out
+
+    asyncio.run(run())
+
+
+def test_two_connections_share_one_file(tmp_path):
+    async def run():
+        path = str(tmp_path / "shared.sqlite3")
+        a, b = open_store(path), open_store("sqlite:///" + path)
+        await a.put("jobs", "j1", {"status": "running"})
+        assert await b.get("jobs", "j1") == {"status": "running"}
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
@@ -0,0 +1,99 @@
+# test_storage.py  – local and S3 upload storage (S3 against benchmarks/stub_s3.py)
+
+import asyncio
+import io
+import json
+import os
+
+import pytest
+from fastapi import UploadFile
+
+import config
+import stub_s3
+from storage import LocalStorage, S3Storage, display_name, previous_versions, valid_name
+
+
+def upload(name: str, data: bytes, size: int | None = None) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=name, size=size)
+
+
+async def read(storage, session_id: str, name: str) -> bytes:
+    return b"".join([chunk async for chunk in storage.iter_bytes(session_id, name)])
+
+
+def test_names():
+    assert valid_name("a.pdf")
+    assert not valid_name("") and not valid_name(".manifest") and not valid_name("../a.pdf")
+    assert display_name("20250101_120000_pump manual.pdf") == "pump manual.pdf"
+    assert display_name("notes.txt") == "notes.txt"
+    names = ["20250101_120000_a.pdf", "20250102_090000_a.pdf", "20250101_120000_b.pdf", "a.pdf"]
+    assert previous_versions(names, "a.pdf") == names[:2]
+
+
+@pytest.fixture
+def s3(tmp_path):
+    server = stub_s3.start(page_size=2)              # small pages exercise continuation
+    storage = S3Storage(bucket="ot", endpoint=f"http://127.0.0.1:{server.server_address[1]}",
+                        prefix="uploads/", region="us-east-1", access_key="test",
+                        secret_key="test", staging_dir=str(tmp_path / "staging"))
+    yield storage
+    asyncio.run(storage.aclose())
+    server.shutdown()
+
+
+def test_local_storage(tmp_path):
+    async def run():
+        storage = LocalStorage(str(tmp_path))
+        assert await storage.names("s1") == []
+        assert await storage.save("s1", "a.pdf", upload("a.pdf", b"%PDF-1")) == 6
+        await storage.save("s1", "b.txt", upload("b.txt", b"hello"))
+        open(os.path.join(storage.folder("s1"), ".ingest_manifest.json"), "w").close()
+        assert await storage.names("s1") == ["a.pdf", "b.txt"]
+        assert await storage.size("s1", "b.txt") == 5
+        assert await storage.size("s1", "missing") is None
+        assert await read(storage, "s1", "a.pdf") == b"%PDF-1"
+        assert await storage.stage("s1") == storage.folder("s1")
+        await storage.delete("s1", "a.pdf")
+        await storage.delete("s1", "a.pdf")
+        assert await storage.names("s1") == ["b.txt"]
+
+    asyncio.run(run())
+
+
+def test_s3_storage(s3):
+    async def run():
+        for i in range(5):                       # no size: measured by seeking
+            await s3.save("s1", f"f{i}.txt", upload(f"f{i}.txt", b"x" * i))
+        assert await s3.save("s2", "other.txt", upload("other.txt", b"other", size=5)) == 5
+        assert await s3.names("s1") == [f"f{i}.txt" for i in range(5)]
+        assert await s3.size("s1", "f3.txt") == 3
+        assert await s3.size("s1", "missing") is None
+        assert await read(s3, "s2", "other.txt") == b"other"
+        await s3.delete("s1", "f0.txt")
+        await s3.delete("s1", "f0.txt")
+        assert "f0.txt" not in await s3.names("s1")
+
+    asyncio.run(run())
+
+
+def test_s3_stage_and_commit(s3):
+    async def run():
+        await s3.save("s1", "a.txt", upload("a.txt", b"one"))
+        await s3.save("s1", "b.txt", upload("b.txt", b"two"))
+        folder = await s3.stage("s1")
+        assert sorted(n for n in os.listdir(folder) if not n.startswith(".")) == ["a.txt", "b.txt"]
+
+        # the loader writes its manifest into the staging folder
+        with open(os.path.join(folder, config.MANIFEST_NAME), "w") as f:
+            json.dump({"files": {"a.txt": {}}}, f)
+        await s3.commit("s1")
+        assert await read(s3, "s1", config.MANIFEST_NAME) == b'{"files": {"a.txt": {}}}'
+
+        await s3.delete("s1", "b.txt")
+        await s3.save("s1", "a.txt", upload("a.txt", b"changed"))
+        await s3.stage("s1")
+        assert not os.path.exists(os.path.join(folder, "b.txt"))
+        with open(os.path.join(folder, "a.txt"), "rb") as f:
+            assert f.read() == b"changed"
+
+    asyncio.run(run())
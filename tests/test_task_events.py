@@ -0,0 +1,97 @@
+# test_task_events.py  – Task-mode event log and completion stats
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from task_events import TaskEventStore, validate
+
+
+def event(task_id, status, ts, session_id="s1", answer_id="a1", task_type="General", sop=""):
+    return {"session_id": session_id, "answer_id": answer_id, "task_id": task_id,
+            "status": status, "ts": ts, "task_type": task_type, "sop": sop}
+
+
+def record(path, events) -> TaskEventStore:
+    async def run():
+        store = TaskEventStore(str(path), batch_size=1000, flush_interval=60)
+        store.record(events)
+        await store.flush()
+        return store
+
+    return asyncio.run(run())
+
+
+def test_validate_rejects_malformed_events():
+    with pytest.raises(ValueError, match="session_id"):
+        validate({"task_id": 1, "status": "completed"})
+    with pytest.raises(ValueError, match="status"):
+        validate({"session_id": "s", "task_id": 1, "status": "done"})
+    with pytest.raises(ValueError, match="task_id"):
+        validate({"session_id": "s", "task_id": "x", "status": "completed"})
+    assert validate({"session_id": "s", "task_id": "3", "status": "completed", "ts": 5})[:4] == \
+        (5.0, "s", "", 3)
+
+
+def test_stats_count_the_latest_state_of_each_task(tmp_path):
+    store = record(tmp_path / "events.sqlite3", [
+        event(1, "completed", 10, sop="pump.pdf", task_type="Safety"),
+        event(1, "incomplete", 20, sop="pump.pdf", task_type="Safety"),    # unticked later
+        event(2, "completed", 15, sop="pump.pdf"),
+        event(1, "completed", 12, answer_id="a2", sop="valve.pdf"),        # same number, other answer
+        event(1, "completed", 30, session_id="s2", sop="valve.pdf"),
+    ])
+    stats = store.stats()
+    assert stats["total"] == {"total": 4, "completed": 3, "completion_rate": 0.75, "last_update": 30.0}
+    assert {r["sop"]: (r["total"], r["completed"]) for r in stats["by_sop"]} == \
+        {"pump.pdf": (2, 1), "valve.pdf": (2, 2)}
+    assert {r["task_type"]: r["completed"] for r in stats["by_type"]} == {"General": 3, "Safety": 0}
+    assert [r["session_id"] for r in stats["by_session"]] == ["s1", "s2"]
+
+    assert store.stats(session_id="s1")["total"]["total"] == 3
+    assert store.stats(sop="valve.pdf", session_id="s1")["total"]["completed"] == 1
+    assert store.stats(since=16)["total"]["total"] == 2
+    assert store.stats(session_id="nobody")["total"] == \
+        {"total": 0, "completed": 0, "completion_rate": 0.0, "last_update": None}
+    asyncio.run(store.stop())
+
+
+def test_out_of_order_batches_keep_the_newest_state(tmp_path):
+    path = tmp_path / "events.sqlite3"
+    store = record(path, [event(1, "completed", 20)])
+    store.record([event(1, "incomplete", 10)])          # an older event arriving late
+    asyncio.run(store.flush())
+    assert store.stats()["total"]["completed"] == 1
+    asyncio.run(store.stop())
+
+
+def test_stats_off_the_event_loop(tmp_path):
+    store = record(tmp_path / "events.sqlite3", [event(i, "completed", i) for i in range(50)])
+
+    async def run():
+        results = await asyncio.gather(*(asyncio.to_thread(store.stats) for _ in range(8)))
+        assert {r["total"]["total"] for r in results} == {50}
+
+    asyncio.run(run())
+    asyncio.run(store.stop())
+
+
+def test_migrates_databases_without_answer_id(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE task_events (id INTEGER PRIMARY KEY, ts REAL NOT NULL,
+            session_id TEXT NOT NULL, task_id INTEGER NOT NULL, description TEXT NOT NULL DEFAULT '',
+            task_type TEXT NOT NULL DEFAULT 'General', sop TEXT NOT NULL DEFAULT '', status TEXT NOT NULL);
+        CREATE TABLE task_state (session_id TEXT NOT NULL, task_id INTEGER NOT NULL,
+            description TEXT NOT NULL, task_type TEXT NOT NULL, sop TEXT NOT NULL,
+            status TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (session_id, task_id));
+        INSERT INTO task_events (ts, session_id, task_id, status) VALUES (1, 's1', 1, 'completed');
+        INSERT INTO task_state VALUES ('s1', 1, '', 'General', '', 'completed', 1);
+    """)
+    db.close()
+    store = record(path, [event(1, "incomplete", 2)])     # same task number, new answer
+    assert store.stats()["total"]["total"] == 2
+    assert store.stats()["total"]["completed"] == 1
+    asyncio.run(store.stop())